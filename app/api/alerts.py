@@ -0,0 +1,108 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.crud import (
+    create_alert,
+    delete_alert,
+    get_alert,
+    get_latest_rate,
+    list_alerts,
+    update_alert,
+)
+from ..db.database import get_read_session, get_session
+from ..models.schemas import AlertCreate, AlertRead, AlertUpdate
+
+router = APIRouter(tags=["alerts"])
+
+
+async def _sync_replicas(request: Request, alert_id: int, alert: Optional[AlertRead]) -> None:
+    """Индекс правил свой у каждой реплики, изменение рассылается через NATS"""
+    await request.app.state.nats.emit(
+        "alerts_changed",
+        {"id": alert_id, "alert": alert.model_dump(mode="json") if alert else None},
+    )
+
+
+async def _current_price(request: Request, session: AsyncSession, code: str) -> Optional[float]:
+    """Текущая цена пары для правила change_pct"""
+    price = request.app.state.alerts.last_price(code)
+    if price is not None:
+        return price
+    rate = await get_latest_rate(session, code)
+    return rate.value if rate else None
+
+
+@router.get("/alerts", response_model=list[AlertRead])
+async def list_alerts_api(session: AsyncSession = Depends(get_read_session)):
+    alerts = await list_alerts(session)
+    return [AlertRead.model_validate(alert) for alert in alerts]
+
+
+@router.get("/alerts/{alert_id}", response_model=AlertRead)
+async def get_alert_api(alert_id: int, session: AsyncSession = Depends(get_read_session)):
+    alert = await get_alert(session, alert_id)
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    return AlertRead.model_validate(alert)
+
+
+@router.post("/alerts", response_model=AlertRead, status_code=201)
+async def create_alert_api(
+    payload: AlertCreate,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+):
+    base_value = payload.base_value
+    if payload.kind == "change_pct" and base_value is None:
+        base_value = await _current_price(request, session, payload.currency_code)
+        if base_value is None:
+            raise HTTPException(
+                status_code=422, detail="No price yet for this pair, pass base_value"
+            )
+
+    alert = await create_alert(session, payload, base_value=base_value)
+    request.app.state.alerts.add(alert)
+    alert_view = AlertRead.model_validate(alert)
+    await _sync_replicas(request, alert.id, alert_view)
+    return alert_view
+
+
+@router.patch("/alerts/{alert_id}", response_model=AlertRead)
+async def update_alert_api(
+    alert_id: int,
+    payload: AlertUpdate,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+):
+    alert = await get_alert(session, alert_id)
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+
+    base_value = payload.base_value
+    if alert.kind == "change_pct" and payload.enabled and base_value is None:
+        # Повторно взведенное правило считает отклонение от текущей цены
+        base_value = await _current_price(request, session, alert.currency_code)
+
+    alert = await update_alert(session, alert, payload, base_value=base_value)
+    request.app.state.alerts.add(alert)
+    alert_view = AlertRead.model_validate(alert)
+    await _sync_replicas(request, alert.id, alert_view)
+    return alert_view
+
+
+@router.delete("/alerts/{alert_id}", status_code=204)
+async def delete_alert_api(
+    alert_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+):
+    alert = await get_alert(session, alert_id)
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+
+    await delete_alert(session, alert)
+    request.app.state.alerts.remove(alert_id)
+    await _sync_replicas(request, alert_id, None)
+    return None
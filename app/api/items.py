@@ -3,26 +3,81 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db.crud import (
+    bulk_set_enabled,
+    bulk_upsert_currencies,
     create_currency,
     delete_currency,
     get_currency,
     list_currencies,
     update_currency,
 )
-from ..db.database import get_session
-from ..models.schemas import CurrencyCreate, CurrencyRead, CurrencyUpdate
+from ..db.database import get_read_session, get_session
+from ..models.schemas import (
+    CurrencyBulkCreate,
+    CurrencyBulkResult,
+    CurrencyBulkUpdate,
+    CurrencyCreate,
+    CurrencyRead,
+    CurrencyUpdate,
+)
 
 router = APIRouter(tags=["items"])
 
 
 @router.get("/items", response_model=list[CurrencyRead])
-async def list_items(session: AsyncSession = Depends(get_session)):
+async def list_items(session: AsyncSession = Depends(get_read_session)):
     items = await list_currencies(session)
     return [CurrencyRead.model_validate(item) for item in items]
 
 
+async def _emit_items_changed(request: Request, result: CurrencyBulkResult) -> None:
+    """Одно событие на всю массовую операцию"""
+    if not result.created and not result.updated:
+        return
+    payload = {
+        "created": [item.model_dump() for item in result.created],
+        "updated": [item.model_dump() for item in result.updated],
+    }
+    await request.app.state.nats.emit("items_changed", payload)
+
+
+# Массовые маршруты объявлены раньше /items/{item_id}
+@router.post("/items/bulk", response_model=CurrencyBulkResult)
+async def bulk_create_items_api(
+    payload: CurrencyBulkCreate,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+):
+    created, updated, conflicts = await bulk_upsert_currencies(
+        session, payload.items, on_conflict=payload.on_conflict
+    )
+
+    result = CurrencyBulkResult(
+        created=[CurrencyRead.model_validate(item) for item in created],
+        updated=[CurrencyRead.model_validate(item) for item in updated],
+        conflicts=conflicts,
+    )
+    await _emit_items_changed(request, result)
+    return result
+
+
+@router.patch("/items/bulk", response_model=CurrencyBulkResult)
+async def bulk_update_items_api(
+    payload: CurrencyBulkUpdate,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+):
+    updated, conflicts = await bulk_set_enabled(session, payload.codes, payload.enabled)
+    result = CurrencyBulkResult(
+        updated=[CurrencyRead.model_validate(item) for item in updated],
+        conflicts=conflicts,
+    )
+    await _emit_items_changed(request, result)
+    return result
+
+
 @router.get("/items/{item_id}", response_model=CurrencyRead)
-async def get_item_api(item_id: int, session: AsyncSession = Depends(get_session)):
+async def get_item_api(item_id: int, session: AsyncSession = Depends(get_read_session)):
     item = await get_currency(session, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -0,0 +1,8 @@
+from fastapi import APIRouter, Request
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics/latency")
+async def get_latency_metrics(request: Request):
+    return request.app.state.latency.snapshot()
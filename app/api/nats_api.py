@@ -10,6 +10,8 @@ async def nats_status(request: Request):
     nats = request.app.state.nats
     return {
         "connected": nats.is_connected,
+        "degraded": nats.is_degraded,
+        "last_error": nats.last_error,
         "url": nats.url,
         "subject": nats.subject,
         "source_id": nats.source_id,
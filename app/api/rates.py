@@ -1,18 +1,18 @@
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db.crud import get_latest_rate, list_rates
-from ..db.database import get_session
-from ..models.schemas import RateRead
+from ..db.crud import get_latest_rate, list_rate_buckets, list_rates
+from ..db.database import get_read_session
+from ..models.schemas import RateBucketRead, RateRead, RateStatsRead
 
 router = APIRouter(tags=["rates"])
 
 
 @router.get("/rates", response_model=list[RateRead])
 async def list_rates_api(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     code: str = Query(..., min_length=1, max_length=20),
     limit: int = Query(50, ge=1, le=500),
 ):
@@ -20,9 +20,32 @@ async def list_rates_api(
     return [RateRead.model_validate(rate) for rate in rates]
 
 
+@router.get("/rates/history", response_model=list[RateBucketRead])
+async def list_rate_history_api(
+    session: AsyncSession = Depends(get_read_session),
+    code: str = Query(..., min_length=1, max_length=20),
+    bucket: Literal["1m", "1h", "1d"] = Query("1h"),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    return await list_rate_buckets(session, code, bucket=bucket, limit=limit)
+
+
+@router.get("/rates/stats", response_model=RateStatsRead)
+async def get_rate_stats_api(
+    request: Request,
+    codes: str = Query(..., min_length=1, description="Коды пар через запятую"),
+    window: int = Query(500, ge=2, le=100_000),
+    rolling: int = Query(10, ge=1, le=10_000),
+):
+    code_list = [code for code in codes.split(",") if code.strip()]
+    if not code_list or len(code_list) > 50:
+        raise HTTPException(status_code=422, detail="codes must contain 1..50 pairs")
+    return await request.app.state.analytics.stats(code_list, window=window, rolling=rolling)
+
+
 @router.get("/rates/latest", response_model=Optional[RateRead])
 async def get_latest_rate_api(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     code: str = Query(..., min_length=1, max_length=20),
 ):
     rate = await get_latest_rate(session, code)
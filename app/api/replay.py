@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from ..models.schemas import ReplayStartRequest
+
+router = APIRouter(tags=["replay"])
+
+
+@router.post("/replay/start", status_code=202)
+async def start_replay(request: Request, payload: ReplayStartRequest):
+    replayer = request.app.state.replayer
+    if replayer.is_running:
+        raise HTTPException(status_code=409, detail="Replay is already running")
+    if payload.end is not None and payload.end < payload.start:
+        raise HTTPException(status_code=422, detail="end must not be before start")
+
+    await replayer.start(
+        payload.start,
+        payload.end,
+        codes=payload.codes,
+        speed=payload.speed,
+        max_rate=payload.max_rate,
+    )
+    return replayer.status()
+
+
+@router.post("/replay/stop")
+async def stop_replay(request: Request):
+    await request.app.state.replayer.stop()
+    return request.app.state.replayer.status()
+
+
+@router.get("/replay/status")
+async def get_replay_status(request: Request):
+    return request.app.state.replayer.status()
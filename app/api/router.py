@@ -1,8 +1,11 @@
 from fastapi import APIRouter
 
+from .alerts import router as alerts_router
 from .items import router as items_router
+from .metrics import router as metrics_router
 from .nats_api import router as nats_router
 from .rates import router as rates_router
+from .replay import router as replay_router
 from .tasks import router as tasks_router
 from .ui import router as ui_router
 
@@ -11,4 +14,7 @@ router.include_router(ui_router)
 router.include_router(items_router)
 router.include_router(tasks_router)
 router.include_router(rates_router)
-router.include_router(nats_router)
\ No newline at end of file
+router.include_router(alerts_router)
+router.include_router(nats_router)
+router.include_router(metrics_router)
+router.include_router(replay_router)
\ No newline at end of file
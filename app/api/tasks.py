@@ -11,6 +11,7 @@ async def run_background_task(request: Request):
         "status": {
             "nats_connected": request.app.state.nats.is_connected,
             "rates_updater": request.app.state.rates_updater.status(),
+            "db_writer": request.app.state.db_writer.status(),
         },
     }
 
@@ -20,5 +21,9 @@ async def get_tasks_status(request: Request):
     return {
         "nats_connected": request.app.state.nats.is_connected,
         "rates_updater": request.app.state.rates_updater.status(),
+        "db_writer": request.app.state.db_writer.status(),
+        "analytics": request.app.state.analytics.status(),
+        "alerts": request.app.state.alerts.status(),
+        "sse": request.app.state.events.status(),
     }
 
@@ -9,11 +9,35 @@ from pathlib import Path
 class Settings:
     nats_url: str = os.getenv("NATS_URL", "nats://127.0.0.1:4222")
     nats_subject: str = os.getenv("NATS_SUBJECT", "items.updates")
+    nats_retry_seconds: float = float(os.getenv("NATS_RETRY_SECONDS", "1"))
+
+    sse_buffer_size: int = int(os.getenv("SSE_BUFFER_SIZE", "1000"))
+    sse_heartbeat_seconds: float = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+    # Экспорт спанов задержек: "" выключен, "otlp" в коллектор, "file" в TRACE_EXPORT_PATH
+    trace_export: str = os.getenv("TRACE_EXPORT", "")
+    trace_export_path: str = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+    trace_window: int = int(os.getenv("TRACE_WINDOW", "2048"))
+
+    # Быстрый старт для автоскейлинга: схема по штампу версии и NATS в фоне
+    fast_startup: bool = os.getenv("FAST_STARTUP", "0").lower() in ("1", "true", "yes")
 
     rates_interval_seconds: int = int(os.getenv("RATES_INTERVAL_SECONDS", "60"))
     rates_source_url: str = os.getenv(
         "RATES_SOURCE_URL", "https://api.binance.com/api/v3/ticker/price"
     )
+    # Компактная схема rate_ticks: цены целыми с масштабом, время в микросекундах
+    rates_compact: bool = os.getenv("RATES_COMPACT", "0").lower() in ("1", "true", "yes")
+    rates_first_delay_seconds: float = float(os.getenv("RATES_FIRST_DELAY_SECONDS", "0"))
+    rates_first_jitter_seconds: float = float(os.getenv("RATES_FIRST_JITTER_SECONDS", "0"))
+
+    database_read_url: str = os.getenv("DATABASE_READ_URL", "")
+    db_read_pool_size: int = int(os.getenv("DB_READ_POOL_SIZE", "5"))
+    db_write_pool_size: int = int(os.getenv("DB_WRITE_POOL_SIZE", "1"))
+
+    db_writer_batch_size: int = int(os.getenv("DB_WRITER_BATCH_SIZE", "500"))
+    db_writer_flush_seconds: float = float(os.getenv("DB_WRITER_FLUSH_SECONDS", "0.5"))
+    db_writer_max_queue: int = int(os.getenv("DB_WRITER_MAX_QUEUE", "10000"))
 
     @property
     def default_db_path(self) -> str:
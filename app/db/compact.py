@@ -0,0 +1,329 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Optional, Union
+
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.orm import RateTick, Source, Symbol
+
+# Binance отдает цены с 8 знаками после запятой
+DEFAULT_SCALE = 8
+MAX_SCALE = 12
+INT64_MAX = 2**63 - 1
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Кэши id писателя, коды и источники только добавляются
+_symbols: dict[str, tuple[int, int]] = {}
+_sources: dict[str, int] = {}
+# Кэши читателя id -> (код, масштаб) и id -> источник, чтобы не делать join на строку
+_symbol_names: dict[int, tuple[str, int]] = {}
+_source_names: dict[int, str] = {}
+
+
+@dataclass
+class RateView:
+    """Строка компактной схемы в виде обычной записи цены"""
+    id: int
+    currency_code: str
+    nominal: int
+    value: float
+    fetched_at: datetime
+    source: str
+    created_at: datetime
+
+
+def to_us(moment: datetime) -> int:
+    """datetime в микросекунды от epoch"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    delta = moment - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_us(ts_us: int) -> datetime:
+    """Микросекунды от epoch в datetime UTC"""
+    return datetime.fromtimestamp(ts_us // 1_000_000, timezone.utc).replace(
+        microsecond=ts_us % 1_000_000
+    )
+
+
+def scale_for(value: Union[Decimal, str, float]) -> int:
+    """Масштаб по числу знаков в первой цене пары"""
+    exponent = Decimal(str(value)).as_tuple().exponent
+    places = -exponent if isinstance(exponent, int) and exponent < 0 else 0
+    return min(max(places, DEFAULT_SCALE), MAX_SCALE)
+
+
+def to_scaled(value: Union[Decimal, str, float], scale: int) -> int:
+    """Цена в целое число с масштабом"""
+    scaled = int(Decimal(str(value)).scaleb(scale).to_integral_value(ROUND_HALF_EVEN))
+    if abs(scaled) > INT64_MAX:
+        raise ValueError(f"price {value} does not fit int64 with scale {scale}")
+    return scaled
+
+
+def from_scaled(price: int, scale: int) -> float:
+    """Целое число с масштабом обратно в цену"""
+    return float(Decimal(price).scaleb(-scale))
+
+
+async def _symbol_id(
+    session: AsyncSession, code: str, sample: Union[Decimal, str, float]
+) -> tuple[int, int]:
+    """id и масштаб кода, новый код заводится с масштабом по первой цене"""
+    cached = _symbols.get(code)
+    if cached:
+        return cached
+    stmt = select(Symbol.id, Symbol.scale).where(Symbol.code == code)
+    row = (await session.execute(stmt)).first()
+    if row is None:
+        symbol = Symbol(code=code, scale=scale_for(sample))
+        session.add(symbol)
+        await session.flush()
+        row = (symbol.id, symbol.scale)
+    _symbols[code] = (row[0], row[1])
+    return _symbols[code]
+
+
+async def _source_id(session: AsyncSession, name: str) -> int:
+    """id источника, новый источник заводится при первой записи"""
+    cached = _sources.get(name)
+    if cached:
+        return cached
+    source_id = await session.scalar(select(Source.id).where(Source.name == name))
+    if source_id is None:
+        source = Source(name=name)
+        session.add(source)
+        await session.flush()
+        source_id = source.id
+    _sources[name] = source_id
+    return source_id
+
+
+async def bulk_create_ticks(session: AsyncSession, rows: list[dict]) -> None:
+    """Записать пачку цен в rate_ticks одной транзакцией"""
+    values = []
+    try:
+        for row in rows:
+            symbol_id, scale = await _symbol_id(session, row["currency_code"], row["value"])
+            values.append(
+                {
+                    "symbol_id": symbol_id,
+                    "source_id": await _source_id(session, row["source"]),
+                    "ts_us": to_us(row["fetched_at"]),
+                    "price": to_scaled(row["value"], scale),
+                }
+            )
+        await session.execute(insert(RateTick), values)
+        await session.commit()
+    except Exception:
+        # Новые id могли не попасть в базу, кэш больше не верен
+        _symbols.clear()
+        _sources.clear()
+        raise
+
+
+async def _find_symbol(session: AsyncSession, code: str) -> Optional[tuple[int, int]]:
+    """id и масштаб кода без записи, None если кода нет"""
+    cached = _symbols.get(code)
+    if cached:
+        return cached
+    stmt = select(Symbol.id, Symbol.scale).where(Symbol.code == code)
+    row = (await session.execute(stmt)).first()
+    if row is None:
+        return None
+    _symbols[code] = (row[0], row[1])
+    return _symbols[code]
+
+
+async def _refresh_names(session: AsyncSession) -> None:
+    """Перечитать справочники symbols и sources, они маленькие"""
+    symbols = await session.execute(select(Symbol.id, Symbol.code, Symbol.scale))
+    _symbol_names.update({row.id: (row.code, row.scale) for row in symbols})
+    sources = await session.execute(select(Source.id, Source.name))
+    _source_names.update({row.id: row.name for row in sources})
+
+
+def _has_names(row) -> bool:
+    return row.symbol_id in _symbol_names and row.source_id in _source_names
+
+
+def _ticks_stmt(symbol_id: int):
+    """Последние строки одной пары, покрываются индексом uq_rate_tick_key"""
+    return (
+        select(RateTick.id, RateTick.ts_us, RateTick.price, RateTick.symbol_id, RateTick.source_id)
+        .where(RateTick.symbol_id == symbol_id)
+        .order_by(RateTick.ts_us.desc())
+    )
+
+
+def _to_view(row) -> RateView:
+    code, scale = _symbol_names[row.symbol_id]
+    fetched_at = from_us(row.ts_us)
+    return RateView(
+        id=row.id,
+        currency_code=code,
+        nominal=1,
+        value=from_scaled(row.price, scale),
+        fetched_at=fetched_at,
+        source=_source_names[row.source_id],
+        created_at=fetched_at,
+    )
+
+
+async def _to_views(session: AsyncSession, rows) -> list[RateView]:
+    if not all(_has_names(row) for row in rows):
+        await _refresh_names(session)
+    return [_to_view(row) for row in rows]
+
+
+async def list_rates(
+    session: AsyncSession, currency_code: str, limit: int = 50
+) -> list[RateView]:
+    """История цен по коду пары из компактной схемы"""
+    symbol = await _find_symbol(session, currency_code.upper())
+    if symbol is None:
+        return []
+    result = await session.execute(_ticks_stmt(symbol[0]).limit(limit))
+    return await _to_views(session, result.all())
+
+
+async def get_latest_rate(session: AsyncSession, currency_code: str) -> Optional[RateView]:
+    """Последняя цена по коду пары из компактной схемы"""
+    symbol = await _find_symbol(session, currency_code.upper())
+    if symbol is None:
+        return None
+    rows = (await session.execute(_ticks_stmt(symbol[0]).limit(1))).all()
+    views = await _to_views(session, rows)
+    return views[0] if views else None
+
+
+async def list_rate_series(
+    session: AsyncSession, currency_code: str, limit: int
+) -> list[tuple[int, float]]:
+    """Последние limit точек без join, только нужные колонки"""
+    symbol = await _find_symbol(session, currency_code.upper())
+    if symbol is None:
+        return []
+    symbol_id, scale = symbol
+
+    stmt = (
+        select(RateTick.ts_us, RateTick.price)
+        .where(RateTick.symbol_id == symbol_id)
+        .order_by(RateTick.ts_us.desc())
+        .limit(limit)
+    )
+    result = await session.execute(stmt)
+    divisor = 10**scale
+    return [(ts_us, price / divisor) for ts_us, price in reversed(result.all())]
+
+
+async def list_rates_page(
+    session: AsyncSession,
+    start: datetime,
+    end: Optional[datetime] = None,
+    codes: Optional[list[str]] = None,
+    *,
+    after: Optional[tuple[int, int]] = None,
+    limit: int = 1000,
+) -> tuple[list[dict], Optional[tuple[int, int]]]:
+    """Страница цен за период из rate_ticks, ключ страницы (ts_us, id)"""
+    stmt = select(
+        RateTick.id, RateTick.ts_us, RateTick.price, RateTick.symbol_id, RateTick.source_id
+    ).where(RateTick.ts_us >= to_us(start))
+    if end is not None:
+        stmt = stmt.where(RateTick.ts_us <= to_us(end))
+    if codes:
+        symbols = [await _find_symbol(session, code.upper()) for code in codes]
+        symbol_ids = [symbol[0] for symbol in symbols if symbol is not None]
+        if not symbol_ids:
+            return [], after
+        stmt = stmt.where(RateTick.symbol_id.in_(symbol_ids))
+    if after is not None:
+        stmt = stmt.where(tuple_(RateTick.ts_us, RateTick.id) > tuple_(*after))
+    stmt = stmt.order_by(RateTick.ts_us, RateTick.id).limit(limit)
+
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        return [], after
+    views = await _to_views(session, rows)
+    page = [
+        {
+            "id": view.id,
+            "currency_code": view.currency_code,
+            "nominal": view.nominal,
+            "value": view.value,
+            "fetched_at": view.fetched_at,
+            "source": view.source,
+        }
+        for view in views
+    ]
+    return page, (rows[-1].ts_us, rows[-1].id)
+
+
+_BUCKET_US = {"1m": 60_000_000, "1h": 3_600_000_000, "1d": 86_400_000_000}
+
+
+async def list_rate_buckets(
+    session: AsyncSession, currency_code: str, bucket: str, limit: int
+) -> list[dict]:
+    """История по корзинам, корзина считается целочисленным делением времени"""
+    symbol = await _find_symbol(session, currency_code.upper())
+    if symbol is None:
+        return []
+    symbol_id, scale = symbol
+
+    step = _BUCKET_US[bucket]
+    bucket_expr = (RateTick.ts_us // step) * step
+    grouped = (
+        select(
+            bucket_expr.label("bucket"),
+            func.min(RateTick.ts_us).label("first_at"),
+            func.max(RateTick.ts_us).label("last_at"),
+            func.max(RateTick.price).label("high"),
+            func.min(RateTick.price).label("low"),
+            func.avg(RateTick.price).label("avg"),
+            func.count().label("count"),
+        )
+        .where(RateTick.symbol_id == symbol_id)
+        .group_by(bucket_expr)
+        .order_by(bucket_expr.desc())
+        .limit(limit)
+        .subquery()
+    )
+
+    def price_at(moment):
+        return (
+            select(RateTick.price)
+            .where(RateTick.symbol_id == symbol_id, RateTick.ts_us == moment)
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    stmt = select(
+        grouped.c.bucket,
+        price_at(grouped.c.first_at).label("open"),
+        grouped.c.high,
+        grouped.c.low,
+        price_at(grouped.c.last_at).label("close"),
+        grouped.c.avg,
+        grouped.c.count,
+    ).order_by(grouped.c.bucket.desc())
+    result = await session.execute(stmt)
+
+    divisor = 10**scale
+    return [
+        {
+            "bucket": from_us(int(row.bucket)),
+            "open": from_scaled(row.open, scale) if row.open is not None else None,
+            "high": from_scaled(row.high, scale),
+            "low": from_scaled(row.low, scale),
+            "close": from_scaled(row.close, scale) if row.close is not None else None,
+            "avg": float(row.avg) / divisor,
+            "count": row.count,
+        }
+        for row in result.all()
+    ]
@@ -1,11 +1,12 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import func, insert, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..config import settings
 from ..models import schemas
-from ..models.orm import Currency, Rate
+from ..models.orm import Alert, Currency, Rate
 
 
 async def list_currencies(session: AsyncSession) -> list[Currency]:
@@ -28,7 +29,12 @@ async def get_currency_by_code(session: AsyncSession, code: str) -> Optional[Cur
 
 async def create_currency(session: AsyncSession, data: schemas.CurrencyCreate) -> Currency:
     """Создать новую пару"""
-    currency = Currency(code=data.code.upper(), name=data.name, enabled=data.enabled)
+    currency = Currency(
+        code=data.code.upper(),
+        name=data.name,
+        enabled=data.enabled,
+        poll_interval_seconds=data.poll_interval_seconds,
+    )
     session.add(currency)
     await session.commit()
     await session.refresh(currency)
@@ -43,6 +49,8 @@ async def update_currency(
         currency.name = data.name
     if data.enabled is not None:
         currency.enabled = data.enabled
+    if "poll_interval_seconds" in data.model_fields_set:
+        currency.poll_interval_seconds = data.poll_interval_seconds
 
     session.add(currency)
     await session.commit()
@@ -56,10 +64,197 @@ async def delete_currency(session: AsyncSession, currency: Currency) -> None:
     await session.commit()
 
 
+# Лимит параметров в одном IN для SQLite
+_IN_CHUNK = 500
+
+# Поля, которые массовое обновление берет из запроса
+_BULK_UPDATE_FIELDS = frozenset({"name", "enabled", "poll_interval_seconds"})
+
+
+def _insert_for(session: AsyncSession):
+    """insert диалекта с поддержкой ON CONFLICT"""
+    if session.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert
+
+
+async def _currencies_by_codes(session: AsyncSession, codes: list[str]) -> dict[str, Currency]:
+    """Пары по списку кодов"""
+    found: dict[str, Currency] = {}
+    for start in range(0, len(codes), _IN_CHUNK):
+        chunk = codes[start : start + _IN_CHUNK]
+        result = await session.scalars(select(Currency).where(Currency.code.in_(chunk)))
+        found.update({currency.code: currency for currency in result.all()})
+    return found
+
+
+async def bulk_upsert_currencies(
+    session: AsyncSession, items: list[schemas.CurrencyCreate], *, on_conflict: str = "skip"
+) -> tuple[list[Currency], list[Currency], list[dict]]:
+    """Создать пачку пар одной транзакцией
+
+    Возвращает созданные, обновленные и конфликты вместо исключения
+    """
+    conflicts: list[dict] = []
+    unique: dict[str, schemas.CurrencyCreate] = {}
+    for item in items:
+        code = item.code.strip().upper()
+        if code in unique:
+            conflicts.append({"code": code, "reason": "duplicate in request"})
+            continue
+        unique[code] = item
+
+    existing = await _currencies_by_codes(session, list(unique))
+    updated_codes: list[str] = []
+    new_rows: list[dict] = []
+    for code, item in unique.items():
+        currency = existing.get(code)
+        if currency is None:
+            new_rows.append(
+                {
+                    "code": code,
+                    "name": item.name,
+                    "enabled": item.enabled,
+                    "poll_interval_seconds": item.poll_interval_seconds,
+                }
+            )
+        elif on_conflict == "update":
+            # Как в update_currency меняются только переданные поля
+            for field in _BULK_UPDATE_FIELDS & item.model_fields_set:
+                setattr(currency, field, getattr(item, field))
+            updated_codes.append(code)
+        else:
+            conflicts.append({"code": code, "reason": "already exists"})
+
+    # Коды, которые параллельный запрос вставил после чтения, становятся конфликтами
+    created_codes: list[str] = []
+    for start in range(0, len(new_rows), _IN_CHUNK):
+        chunk = new_rows[start : start + _IN_CHUNK]
+        stmt = _insert_for(session)(Currency).values(chunk)
+        stmt = stmt.on_conflict_do_nothing(index_elements=["code"]).returning(Currency.code)
+        inserted = set((await session.execute(stmt)).scalars().all())
+        for row in chunk:
+            if row["code"] in inserted:
+                created_codes.append(row["code"])
+            else:
+                conflicts.append({"code": row["code"], "reason": "already exists"})
+
+    await session.commit()
+
+    # Одно чтение вместо refresh каждой строки
+    session.expire_all()
+    saved = await _currencies_by_codes(session, created_codes + updated_codes)
+    created = [saved[code] for code in created_codes if code in saved]
+    updated = [saved[code] for code in updated_codes if code in saved]
+    return created, updated, conflicts
+
+
+async def bulk_set_enabled(
+    session: AsyncSession, codes: list[str], enabled: bool
+) -> tuple[list[Currency], list[dict]]:
+    """Включить или отключить пачку пар одной транзакцией"""
+    unique = list(dict.fromkeys(code.strip().upper() for code in codes if code.strip()))
+    existing = await _currencies_by_codes(session, unique)
+    conflicts = [{"code": code, "reason": "not found"} for code in unique if code not in existing]
+
+    for start in range(0, len(unique), _IN_CHUNK):
+        chunk = [code for code in unique[start : start + _IN_CHUNK] if code in existing]
+        if chunk:
+            await session.execute(
+                update(Currency)
+                .where(Currency.code.in_(chunk))
+                .values(enabled=enabled, updated_at=func.now())
+            )
+    await session.commit()
+
+    session.expire_all()
+    saved = await _currencies_by_codes(session, list(existing))
+    return [saved[code] for code in unique if code in saved], conflicts
+
+
+async def list_alerts(session: AsyncSession, *, armed_only: bool = False) -> list[Alert]:
+    """Список оповещений, armed_only оставляет только ждущие срабатывания"""
+    stmt = select(Alert).order_by(Alert.id)
+    if armed_only:
+        stmt = stmt.where(Alert.enabled.is_(True), Alert.triggered_at.is_(None))
+    result = await session.scalars(stmt)
+    return result.all()
+
+
+async def get_alert(session: AsyncSession, alert_id: int) -> Optional[Alert]:
+    """Оповещение по id"""
+    result = await session.scalars(select(Alert).where(Alert.id == alert_id))
+    return result.first()
+
+
+async def create_alert(
+    session: AsyncSession, data: schemas.AlertCreate, *, base_value: Optional[float]
+) -> Alert:
+    """Создать оповещение"""
+    alert = Alert(
+        currency_code=data.currency_code.upper(),
+        kind=data.kind,
+        threshold=data.threshold,
+        base_value=base_value,
+        enabled=True,
+    )
+    session.add(alert)
+    await session.commit()
+    await session.refresh(alert)
+    return alert
+
+
+async def update_alert(
+    session: AsyncSession,
+    alert: Alert,
+    data: schemas.AlertUpdate,
+    *,
+    base_value: Optional[float] = None,
+) -> Alert:
+    """Обновить оповещение, включение сбрасывает срабатывание"""
+    if data.threshold is not None:
+        alert.threshold = data.threshold
+    if base_value is not None:
+        alert.base_value = base_value
+    if data.enabled is not None:
+        alert.enabled = data.enabled
+        if data.enabled:
+            alert.triggered_at = None
+
+    session.add(alert)
+    await session.commit()
+    await session.refresh(alert)
+    return alert
+
+
+async def delete_alert(session: AsyncSession, alert: Alert) -> None:
+    """Удалить оповещение"""
+    await session.delete(alert)
+    await session.commit()
+
+
+async def mark_alerts_triggered(
+    session: AsyncSession, alert_ids: list[int], triggered_at: datetime
+) -> None:
+    """Отметить сработавшие оповещения"""
+    if not alert_ids:
+        return
+    await session.execute(
+        update(Alert).where(Alert.id.in_(alert_ids)).values(triggered_at=triggered_at)
+    )
+    await session.commit()
+
+
 async def list_rates(
     session: AsyncSession, currency_code: str, limit: int = 50
 ) -> list[Rate]:
     """История цен по коду пары"""
+    if settings.rates_compact:
+        from . import compact
+
+        return await compact.list_rates(session, currency_code, limit=limit)
     stmt = (
         select(Rate)
         .where(Rate.currency_code == currency_code.upper())
@@ -72,6 +267,10 @@ async def list_rates(
 
 async def get_latest_rate(session: AsyncSession, currency_code: str) -> Optional[Rate]:
     """Последняя цена по коду пары"""
+    if settings.rates_compact:
+        from . import compact
+
+        return await compact.get_latest_rate(session, currency_code)
     stmt = (
         select(Rate)
         .where(Rate.currency_code == currency_code.upper())
@@ -82,6 +281,71 @@ async def get_latest_rate(session: AsyncSession, currency_code: str) -> Optional
     return result.first()
 
 
+async def get_last_rate_id(session: AsyncSession) -> int:
+    """id последней записанной цены, меняется после каждого коммита писателя"""
+    if settings.rates_compact:
+        from ..models.orm import RateTick
+
+        return await session.scalar(select(func.max(RateTick.id))) or 0
+    return await session.scalar(select(func.max(Rate.id))) or 0
+
+
+async def list_rate_series(
+    session: AsyncSession, currency_code: str, limit: int
+) -> list[tuple[int, float]]:
+    """Последние limit точек (время в микросекундах, цена) по возрастанию времени"""
+    from . import compact
+
+    if settings.rates_compact:
+        return await compact.list_rate_series(session, currency_code, limit)
+    stmt = (
+        select(Rate.fetched_at, Rate.value)
+        .where(Rate.currency_code == currency_code.upper())
+        .order_by(Rate.fetched_at.desc())
+        .limit(limit)
+    )
+    result = await session.execute(stmt)
+    return [(compact.to_us(fetched_at), value) for fetched_at, value in reversed(result.all())]
+
+
+async def list_rates_page(
+    session: AsyncSession,
+    start: datetime,
+    end: Optional[datetime] = None,
+    codes: Optional[list[str]] = None,
+    *,
+    after: Optional[tuple] = None,
+    limit: int = 1000,
+) -> tuple[list[dict], Optional[tuple]]:
+    """Страница цен за период по возрастанию времени и ключ следующей страницы
+
+    Страницы читаются по ключу (время, id) короткими запросами, поэтому длинный
+    проход по истории не держит снимок чтения открытым
+    """
+    if settings.rates_compact:
+        from . import compact
+
+        return await compact.list_rates_page(
+            session, start, end, codes, after=after, limit=limit
+        )
+
+    stmt = select(
+        Rate.id, Rate.currency_code, Rate.nominal, Rate.value, Rate.fetched_at, Rate.source
+    ).where(Rate.fetched_at >= start)
+    if end is not None:
+        stmt = stmt.where(Rate.fetched_at <= end)
+    if codes:
+        stmt = stmt.where(Rate.currency_code.in_([code.upper() for code in codes]))
+    if after is not None:
+        stmt = stmt.where(tuple_(Rate.fetched_at, Rate.id) > tuple_(*after))
+    stmt = stmt.order_by(Rate.fetched_at, Rate.id).limit(limit)
+
+    rows = [dict(row) for row in (await session.execute(stmt)).mappings().all()]
+    if not rows:
+        return rows, after
+    return rows, (rows[-1]["fetched_at"], rows[-1]["id"])
+
+
 async def create_rate(
     session: AsyncSession,
     *,
@@ -103,3 +367,101 @@ async def create_rate(
     await session.commit()
     await session.refresh(rate)
     return rate
+
+
+async def bulk_create_rates(session: AsyncSession, rows: list[dict]) -> None:
+    """Записать пачку цен одной транзакцией"""
+    if not rows:
+        return
+    if settings.rates_compact:
+        from . import compact
+
+        await compact.bulk_create_ticks(session, rows)
+        return
+    values = [
+        {
+            "currency_code": row["currency_code"].upper(),
+            "nominal": row.get("nominal", 1),
+            "value": float(row["value"]),
+            "fetched_at": row["fetched_at"],
+            "source": row["source"],
+        }
+        for row in rows
+    ]
+    if session.bind.dialect.name == "postgresql":
+        from .postgres import copy_rates
+
+        await copy_rates(session, values)
+        return
+    await session.execute(insert(Rate), values)
+    await session.commit()
+
+
+# Формат начала корзины для SQLite и единица date_trunc для Postgres
+_BUCKET_FORMATS: dict[str, tuple[str, str]] = {
+    "1m": ("%Y-%m-%d %H:%M:00", "minute"),
+    "1h": ("%Y-%m-%d %H:00:00", "hour"),
+    "1d": ("%Y-%m-%d 00:00:00", "day"),
+}
+
+
+async def list_rate_buckets(
+    session: AsyncSession, currency_code: str, bucket: str = "1h", limit: int = 50
+) -> list[dict]:
+    """История цен по корзинам open high low close"""
+    if settings.rates_compact:
+        from . import compact
+
+        return await compact.list_rate_buckets(session, currency_code, bucket, limit)
+
+    code = currency_code.upper()
+    dialect = session.bind.dialect.name
+
+    if dialect == "postgresql":
+        from . import postgres
+
+        if postgres.timescale_enabled:
+            return await postgres.list_rate_buckets(session, code, bucket, limit)
+
+    sqlite_format, pg_unit = _BUCKET_FORMATS[bucket]
+    if dialect == "sqlite":
+        bucket_expr = func.strftime(sqlite_format, Rate.fetched_at)
+    else:
+        bucket_expr = func.date_trunc(pg_unit, Rate.fetched_at)
+
+    grouped = (
+        select(
+            bucket_expr.label("bucket"),
+            func.min(Rate.fetched_at).label("first_at"),
+            func.max(Rate.fetched_at).label("last_at"),
+            func.max(Rate.value).label("high"),
+            func.min(Rate.value).label("low"),
+            func.avg(Rate.value).label("avg"),
+            func.count().label("count"),
+        )
+        .where(Rate.currency_code == code)
+        .group_by(bucket_expr)
+        .order_by(bucket_expr.desc())
+        .limit(limit)
+        .subquery()
+    )
+
+    def value_at(moment):
+        return (
+            select(Rate.value)
+            .where(Rate.currency_code == code, Rate.fetched_at == moment)
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    stmt = select(
+        grouped.c.bucket,
+        value_at(grouped.c.first_at).label("open"),
+        grouped.c.high,
+        grouped.c.low,
+        value_at(grouped.c.last_at).label("close"),
+        grouped.c.avg,
+        grouped.c.count,
+    ).order_by(grouped.c.bucket.desc())
+    result = await session.execute(stmt)
+    return [dict(row) for row in result.mappings().all()]
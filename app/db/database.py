@@ -1,8 +1,17 @@
 from pathlib import Path
-from typing import AsyncIterator
+from typing import AsyncIterator, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event, inspect, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from ..config import settings
 
@@ -10,8 +19,107 @@ from ..config import settings
 DEFAULT_DB_PATH = settings.default_db_path
 DATABASE_URL = settings.database_url
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+# Увеличивать при каждом изменении схемы
+SCHEMA_VERSION = 5
+
+# Индексы прошлых версий схемы, которые больше не нужны
+OBSOLETE_INDEXES = ("ix_rate_ticks_symbol_ts",)
+
+
+def is_sqlite(url: str) -> bool:
+    """Проверка что адрес указывает на SQLite"""
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def is_postgres(url: str) -> bool:
+    """Проверка что адрес указывает на PostgreSQL"""
+    return make_url(url).get_backend_name() == "postgresql"
+
+
+def _sqlite_read_url(url: str) -> str:
+    """Адрес SQLite только для чтения через URI mode=ro"""
+    parsed = make_url(url)
+    database = parsed.database or ""
+    if database.startswith("file:"):
+        return url
+    path = Path(database).resolve().as_posix()
+    return parsed.set(
+        database=f"file:{path}", query={**parsed.query, "mode": "ro", "uri": "true"}
+    ).render_as_string(hide_password=False)
+
+
+def _is_memory(url: str) -> bool:
+    """SQLite в памяти нельзя открыть вторым движком"""
+    database = make_url(url).database or ""
+    return is_sqlite(url) and (not database or database == ":memory:")
+
+
+def _pool_options(url: str, size: int) -> dict:
+    """Размер пула, SQLite в памяти работает без пула
+
+    Для файлов SQLite по умолчанию NullPool, размер пула задается только с очередью
+    """
+    if _is_memory(url):
+        return {}
+    options = {"pool_size": size, "max_overflow": 0}
+    if is_sqlite(url):
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return options
+
+
+def _read_engine_options(url: str) -> dict:
+    """Параметры движка для читателей"""
+    options = _pool_options(url, settings.db_read_pool_size)
+    if is_postgres(url):
+        options["connect_args"] = {
+            "server_settings": {"default_transaction_read_only": "on"}
+        }
+    return options
+
+
+READ_DATABASE_URL = settings.database_read_url or (
+    _sqlite_read_url(DATABASE_URL)
+    if is_sqlite(DATABASE_URL) and not _is_memory(DATABASE_URL)
+    else DATABASE_URL
+)
+
+# Писатель держит свое соединение и не делит пул с API
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    future=True,
+    **_pool_options(DATABASE_URL, settings.db_write_pool_size),
+)
+if _is_memory(DATABASE_URL):
+    read_engine = engine
+else:
+    read_engine = create_async_engine(
+        READ_DATABASE_URL, echo=False, future=True, **_read_engine_options(READ_DATABASE_URL)
+    )
+
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False)
+
+
+if is_sqlite(DATABASE_URL):
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_writer_pragmas(dbapi_connection, _record) -> None:
+        """WAL позволяет читать пока идет запись"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
+if read_engine is not engine and is_sqlite(READ_DATABASE_URL):
+
+    @event.listens_for(read_engine.sync_engine, "connect")
+    def _sqlite_reader_pragmas(dbapi_connection, _record) -> None:
+        """Читатели не могут ничего записать"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
 
 
 class Base(DeclarativeBase):
@@ -24,9 +132,80 @@ async def get_session() -> AsyncIterator[AsyncSession]:
         yield session
 
 
-async def init_db() -> None:
-    """Создать таблицы если их нет"""
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    """Сессия только для чтения для FastAPI"""
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+def _add_missing_columns(sync_conn) -> None:
+    """Добавить в существующие таблицы новые nullable колонки
+
+    create_all не меняет уже созданные таблицы, а миграций в проекте нет
+    """
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.exec_driver_sql(
+                f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'
+            )
+
+
+def _drop_obsolete_indexes(sync_conn) -> None:
+    """Удалить индексы, которые дублируют другие и только занимают место"""
+    for name in OBSOLETE_INDEXES:
+        sync_conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+
+async def _stamped_version(bind: AsyncEngine) -> Optional[int]:
+    """Версия схемы из штампа или None если штампа нет"""
+    from ..models.orm import SchemaMeta
+
+    try:
+        async with bind.connect() as conn:
+            return await conn.scalar(select(SchemaMeta.version).where(SchemaMeta.id == 1))
+    except DBAPIError:
+        return None
+
+
+async def init_db(*, use_stamp: bool = False, bind: Optional[AsyncEngine] = None) -> None:
+    """Создать таблицы если их нет
+
+    С use_stamp схема не сверяется целиком если штамп версии совпадает.
+    bind позволяет подготовить другую базу, например в тестах
+    """
     from ..models import orm as _orm
 
-    async with engine.begin() as conn:
+    bind = bind or engine
+    postgres = bind.dialect.name == "postgresql"
+
+    if use_stamp and await _stamped_version(bind) == SCHEMA_VERSION:
+        if postgres:
+            from .postgres import detect_timescale
+
+            async with bind.connect() as conn:
+                await detect_timescale(conn)
+        return
+
+    async with bind.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_drop_obsolete_indexes)
+
+    if postgres:
+        from .postgres import setup_postgres
+
+        async with bind.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await setup_postgres(conn)
+
+    async with AsyncSession(bind) as session:
+        await session.merge(_orm.SchemaMeta(id=1, version=SCHEMA_VERSION))
+        await session.commit()
@@ -0,0 +1,133 @@
+import logging
+from decimal import Decimal
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+logger = logging.getLogger("currency_tracker.postgres")
+
+# Размер корзины истории и соответствующий continuous aggregate
+BUCKETS: dict[str, tuple[str, str]] = {
+    "1m": ("1 minute", "rates_ohlc_1m"),
+    "1h": ("1 hour", "rates_ohlc_1h"),
+    "1d": ("1 day", "rates_ohlc_1d"),
+}
+
+RATE_COPY_COLUMNS = ("currency_code", "nominal", "value", "fetched_at", "source")
+
+# Выставляется в setup_postgres если TimescaleDB доступен
+timescale_enabled = False
+
+
+async def setup_postgres(conn: AsyncConnection) -> None:
+    """Индексы, hypertable и continuous aggregates для rates"""
+    global timescale_enabled
+
+    await conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_rates_code_fetched "
+            "ON rates (currency_code, fetched_at DESC)"
+        )
+    )
+
+    available = await conn.scalar(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'timescaledb'")
+    )
+    if not available:
+        logger.info("timescaledb is not available, rates stays a plain table")
+        timescale_enabled = False
+        return
+
+    await conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb"))
+
+    is_hypertable = await conn.scalar(
+        text(
+            "SELECT 1 FROM timescaledb_information.hypertables "
+            "WHERE hypertable_name = 'rates'"
+        )
+    )
+    if not is_hypertable:
+        # Первичный ключ hypertable обязан включать колонку партиционирования
+        await conn.execute(text("ALTER TABLE rates DROP CONSTRAINT IF EXISTS rates_pkey"))
+        await conn.execute(text("ALTER TABLE rates ADD PRIMARY KEY (id, fetched_at)"))
+        await conn.execute(
+            text(
+                "SELECT create_hypertable('rates', 'fetched_at', "
+                "chunk_time_interval => INTERVAL '1 day', migrate_data => true)"
+            )
+        )
+
+    for interval, view in BUCKETS.values():
+        await conn.execute(
+            text(
+                f"CREATE MATERIALIZED VIEW IF NOT EXISTS {view} "
+                "WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS "
+                f"SELECT currency_code, time_bucket(INTERVAL '{interval}', fetched_at) AS bucket, "
+                "first(value, fetched_at) AS open, max(value) AS high, min(value) AS low, "
+                "last(value, fetched_at) AS close, avg(value) AS avg, count(*) AS count "
+                "FROM rates GROUP BY currency_code, bucket WITH NO DATA"
+            )
+        )
+        await conn.execute(
+            text(
+                f"SELECT add_continuous_aggregate_policy('{view}', "
+                f"start_offset => INTERVAL '3 {interval.split()[1]}s', "
+                f"end_offset => INTERVAL '{interval}', "
+                f"schedule_interval => INTERVAL '{interval}', if_not_exists => true)"
+            )
+        )
+
+    timescale_enabled = True
+
+
+async def detect_timescale(conn: AsyncConnection) -> None:
+    """Узнать без миграций что rates уже hypertable"""
+    global timescale_enabled
+
+    try:
+        timescale_enabled = bool(
+            await conn.scalar(
+                text(
+                    "SELECT 1 FROM timescaledb_information.hypertables "
+                    "WHERE hypertable_name = 'rates'"
+                )
+            )
+        )
+    except DBAPIError:
+        timescale_enabled = False
+
+
+async def copy_rates(session: AsyncSession, rows: list[dict]) -> None:
+    """Вставка пачки цен через COPY"""
+    records = [
+        (
+            row["currency_code"],
+            row["nominal"],
+            Decimal(str(row["value"])),
+            row["fetched_at"],
+            row["source"],
+        )
+        for row in rows
+    ]
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "rates", records=records, columns=list(RATE_COPY_COLUMNS)
+    )
+    await session.commit()
+
+
+async def list_rate_buckets(
+    session: AsyncSession, currency_code: str, bucket: str, limit: int
+) -> list[dict]:
+    """История из continuous aggregate"""
+    _, view = BUCKETS[bucket]
+    result = await session.execute(
+        text(
+            f"SELECT bucket, open, high, low, close, avg, count FROM {view} "
+            "WHERE currency_code = :code ORDER BY bucket DESC LIMIT :limit"
+        ),
+        {"code": currency_code, "limit": limit},
+    )
+    return [dict(row) for row in result.mappings().all()]
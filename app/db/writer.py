@@ -0,0 +1,235 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ..services.tracing import LatencyTracker
+from . import crud
+
+# Строка в очереди вместе с моментом постановки по монотонным часам
+_Item = tuple[int, dict]
+
+logger = logging.getLogger("currency_tracker.db_writer")
+
+
+def _is_bad_data(err: Exception) -> bool:
+    """Ошибка в самих строках, повтор той же пачки не поможет"""
+    if isinstance(err, (IntegrityError, DataError)):
+        return True
+    if isinstance(err, (ValueError, TypeError, KeyError, ArithmeticError)):
+        return True
+    # asyncpg при COPY отдает свои исключения, классы 22 и 23 это ошибки данных
+    sqlstate = str(getattr(err, "sqlstate", "") or "")
+    return sqlstate[:2] in ("22", "23")
+
+
+class RatesWriter:
+    """Единственный писатель в базу с очередью и пакетными коммитами"""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        *,
+        batch_size: int = 500,
+        flush_seconds: float = 0.5,
+        max_queue: int = 10000,
+        retry_seconds: float = 0.5,
+        max_retry_seconds: float = 10.0,
+        stop_retries: int = 3,
+        tracker: Optional[LatencyTracker] = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self._batch_size = max(1, batch_size)
+        self._flush_seconds = max(0.0, flush_seconds)
+        self._retry_seconds = max(0.01, retry_seconds)
+        self._max_retry_seconds = max(self._retry_seconds, max_retry_seconds)
+        self._stop_retries = max(0, stop_retries)
+        self._queue: asyncio.Queue[_Item] = asyncio.Queue(maxsize=max_queue)
+        self._tracker = tracker
+
+        self._pending: list[_Item] = []
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+        self.committed_rows: int = 0
+        self.committed_batches: int = 0
+        self.failed_batches: int = 0
+        self.dropped_rows: int = 0
+        self.last_batch_size: int = 0
+        self.last_commit_ms: Optional[float] = None
+        self.max_commit_ms: Optional[float] = None
+        self._total_commit_ms: float = 0.0
+        self.last_error: Optional[str] = None
+
+    async def start(self) -> None:
+        """Запуск задачи писателя"""
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._worker())
+
+    async def stop(self) -> None:
+        """Остановка с дозаписью всего что осталось в очереди"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    async def put(self, row: dict) -> None:
+        """Поставить строку в очередь на запись"""
+        await self._queue.put((time.monotonic_ns(), row))
+
+    async def put_many(self, rows: list[dict]) -> None:
+        """Поставить несколько строк в очередь"""
+        enqueued_ns = time.monotonic_ns()
+        for row in rows:
+            await self._queue.put((enqueued_ns, row))
+
+    async def flush(self) -> int:
+        """Записать все строки из очереди прямо сейчас"""
+        written = 0
+        if self._pending:
+            batch, self._pending = self._pending, []
+            written += await self._commit(batch)
+        while not self._queue.empty():
+            written += await self._commit(self._drain(self._batch_size))
+        return written
+
+    def _drain(self, limit: int) -> list[_Item]:
+        """Забрать из очереди до limit строк без ожидания"""
+        batch: list[_Item] = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _worker(self) -> None:
+        """Цикл писателя копит строки по размеру или по времени"""
+        loop = asyncio.get_running_loop()
+        while self._running:
+            # Пачка хранится в self._pending чтобы stop дописал ее при отмене
+            batch = self._pending = [await self._queue.get()]
+            deadline = loop.time() + self._flush_seconds
+
+            while len(batch) < self._batch_size:
+                batch.extend(self._drain(self._batch_size - len(batch)))
+                if len(batch) >= self._batch_size:
+                    break
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Начатый коммит не прерываем даже при остановке
+            self._pending = []
+            commit = asyncio.ensure_future(self._commit(batch))
+            try:
+                await asyncio.shield(commit)
+            except asyncio.CancelledError:
+                await commit
+                raise
+
+    async def _commit(self, batch: list[_Item]) -> int:
+        """Запись пачки с повторами
+
+        Временные ошибки вроде database is locked повторяются с растущей паузой
+        пока писатель запущен, очередь при этом сдерживает обновлятель.
+        При остановке попыток не больше stop_retries. Пачка с плохой строкой
+        делится пополам пока плохая строка не останется одна
+        """
+        if not batch:
+            return 0
+
+        delay = self._retry_seconds
+        attempt = 0
+        while True:
+            try:
+                return await self._commit_once(batch)
+            except Exception as err:
+                self.failed_batches += 1
+                self.last_error = f"{type(err).__name__}: {err}"
+                if _is_bad_data(err):
+                    return await self._split(batch)
+                if not self._running and attempt >= self._stop_retries:
+                    self.dropped_rows += len(batch)
+                    logger.error(
+                        "db writer gave up on %d rows after %d retries: %s",
+                        len(batch),
+                        attempt,
+                        self.last_error,
+                    )
+                    return 0
+                attempt += 1
+                logger.warning(
+                    "db writer failed to commit %d rows, retry %d in %.1fs: %s",
+                    len(batch),
+                    attempt,
+                    delay,
+                    self.last_error,
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._max_retry_seconds)
+
+    async def _split(self, batch: list[_Item]) -> int:
+        """Записать половины по отдельности чтобы найти плохую строку"""
+        if len(batch) == 1:
+            self.dropped_rows += 1
+            logger.error("db writer dropped bad row %r: %s", batch[0][1], self.last_error)
+            return 0
+        middle = len(batch) // 2
+        return await self._commit(batch[:middle]) + await self._commit(batch[middle:])
+
+    async def _commit_once(self, batch: list[_Item]) -> int:
+        """Одна транзакция на всю пачку"""
+        started = time.perf_counter()
+        async with self._session_factory() as session:
+            await crud.bulk_create_rates(session, [row for _, row in batch])
+
+        if self._tracker is not None:
+            # Задержка самой старой строки пачки от постановки в очередь до коммита
+            oldest_ns = min(enqueued_ns for enqueued_ns, _ in batch)
+            self._tracker.observe("enqueued->committed", (time.monotonic_ns() - oldest_ns) / 1e6)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.committed_rows += len(batch)
+        self.committed_batches += 1
+        self.last_batch_size = len(batch)
+        self.last_commit_ms = round(elapsed_ms, 3)
+        self.max_commit_ms = max(self.max_commit_ms or 0.0, self.last_commit_ms)
+        self._total_commit_ms += elapsed_ms
+        self.last_error = None
+        return len(batch)
+
+    def status(self) -> dict:
+        """Статистика писателя для отладки"""
+        avg_commit_ms = None
+        if self.committed_batches:
+            avg_commit_ms = round(self._total_commit_ms / self.committed_batches, 3)
+        return {
+            "running": self._running,
+            "queue_depth": self._queue.qsize(),
+            "queue_max": self._queue.maxsize,
+            "batch_size": self._batch_size,
+            "flush_seconds": self._flush_seconds,
+            "committed_rows": self.committed_rows,
+            "committed_batches": self.committed_batches,
+            "failed_batches": self.failed_batches,
+            "dropped_rows": self.dropped_rows,
+            "last_batch_size": self.last_batch_size,
+            "last_commit_ms": self.last_commit_ms,
+            "avg_commit_ms": avg_commit_ms,
+            "max_commit_ms": self.max_commit_ms,
+            "last_error": self.last_error,
+        }
@@ -3,9 +3,16 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .api.router import router as api_router
 from .config import settings
-from .db.database import SessionLocal, init_db
+from .db.database import ReadSessionLocal, SessionLocal, init_db
+from .db.writer import RatesWriter
 from .nats.client import NatsClient
+from .services.alerts import AlertEngine
+from .services.analytics import RatesAnalytics
+from .services.tracing import LatencyTracker
 from .tasks.rates_updater import RatesUpdater
+from .tasks.replay import RatesReplayer
+from .sse.manager import EventStreamManager
+from .sse.router import router as sse_router
 from .ws.manager import ConnectionManager
 from .ws.router import router as ws_router
 
@@ -25,32 +32,72 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    app.state.manager = ConnectionManager()
+    app.state.latency = LatencyTracker(
+        window=settings.trace_window,
+        export=settings.trace_export,
+        export_path=settings.trace_export_path,
+    )
+    app.state.manager = ConnectionManager(tracker=app.state.latency)
+    app.state.events = EventStreamManager(
+        buffer_size=settings.sse_buffer_size,
+        heartbeat_seconds=settings.sse_heartbeat_seconds,
+    )
+
+    async def fan_out(event: dict) -> None:
+        """Событие из NATS уходит и в WebSocket и в SSE"""
+        app.state.alerts.handle_event(event)
+        await app.state.manager.broadcast(event)
+        await app.state.events.broadcast(event)
+
     app.state.nats = NatsClient(
         url=settings.nats_url,
         subject=settings.nats_subject,
-        on_event=app.state.manager.broadcast,
+        on_event=fan_out,
+        local_fallback=settings.fast_startup,
+    )
+    app.state.db_writer = RatesWriter(
+        SessionLocal,
+        batch_size=settings.db_writer_batch_size,
+        flush_seconds=settings.db_writer_flush_seconds,
+        max_queue=settings.db_writer_max_queue,
+        tracker=app.state.latency,
     )
+    app.state.alerts = AlertEngine(SessionLocal)
     app.state.rates_updater = RatesUpdater(
         SessionLocal,
         notifier=app.state.nats.publish,
+        writer=app.state.db_writer,
+        alerts=app.state.alerts,
         interval_seconds=settings.rates_interval_seconds,
         source_url=settings.rates_source_url,
+        first_delay_seconds=settings.rates_first_delay_seconds,
+        first_jitter_seconds=settings.rates_first_jitter_seconds,
     )
+    app.state.analytics = RatesAnalytics(ReadSessionLocal)
+    app.state.replayer = RatesReplayer(ReadSessionLocal, notifier=app.state.nats.publish)
 
     app.include_router(api_router)
     app.include_router(ws_router)
+    app.include_router(sse_router)
 
     @app.on_event("startup")
     async def on_startup() -> None:
-        await init_db()
-        await app.state.nats.connect()
+        await init_db(use_stamp=settings.fast_startup)
+        await app.state.db_writer.start()
+        await app.state.alerts.load()
+        if settings.fast_startup:
+            app.state.nats.start(retry_seconds=settings.nats_retry_seconds)
+        else:
+            await app.state.nats.connect()
         await app.state.rates_updater.start()
 
     @app.on_event("shutdown")
     async def on_shutdown() -> None:
+        await app.state.replayer.stop()
         await app.state.rates_updater.stop()
+        await app.state.db_writer.stop()
         await app.state.nats.close()
+        app.state.latency.shutdown()
 
     return app
 
@@ -1,6 +1,19 @@
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, Float, Integer, String, UniqueConstraint, func
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    Numeric,
+    SmallInteger,
+    String,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..db.database import Base
@@ -14,6 +27,8 @@ class Currency(Base):
     code: Mapped[str] = mapped_column(String(length=20), unique=True, index=True)
     name: Mapped[str] = mapped_column(String(length=200), default="", server_default="")
     enabled: Mapped[bool] = mapped_column(Boolean, default=True, server_default="1")
+    # Свой интервал опроса, None значит интервал по умолчанию
+    poll_interval_seconds: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
@@ -34,7 +49,10 @@ class Rate(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     currency_code: Mapped[str] = mapped_column(String(length=20), index=True)
     nominal: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
-    value: Mapped[float] = mapped_column(Float)
+    # В Postgres цена хранится точно, наружу по-прежнему float
+    value: Mapped[float] = mapped_column(
+        Float().with_variant(Numeric(28, 12, asdecimal=False), "postgresql")
+    )
     fetched_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
     source: Mapped[str] = mapped_column(
         String(length=200), default="cbr", server_default="cbr"
@@ -43,3 +61,66 @@ class Rate(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
+
+
+class Alert(Base):
+    """Правило оповещения о цене пары"""
+    __tablename__ = "alerts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    currency_code: Mapped[str] = mapped_column(String(length=20), index=True)
+    # above и below срабатывают на пересечении threshold, change_pct на отклонении от base_value
+    kind: Mapped[str] = mapped_column(String(length=20))
+    threshold: Mapped[float] = mapped_column(Float)
+    base_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True, server_default="1")
+    triggered_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class Symbol(Base):
+    """Код пары для компактной схемы со своим масштабом цены"""
+    __tablename__ = "symbols"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    code: Mapped[str] = mapped_column(String(length=20), unique=True)
+    # Цена хранится как value * 10**scale
+    scale: Mapped[int] = mapped_column(SmallInteger)
+
+
+class Source(Base):
+    """Источник цен для компактной схемы"""
+    __tablename__ = "sources"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(length=200), unique=True)
+
+
+class RateTick(Base):
+    """Компактная запись цены: целые числа вместо float и строк"""
+    __tablename__ = "rate_ticks"
+
+    __table_args__ = (
+        # Индекс ключа начинается с (symbol_id, ts_us) и обслуживает чтение истории
+        UniqueConstraint("symbol_id", "ts_us", "source_id", name="uq_rate_tick_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    symbol_id: Mapped[int] = mapped_column(ForeignKey("symbols.id"))
+    source_id: Mapped[int] = mapped_column(ForeignKey("sources.id"))
+    # Время в микросекундах от epoch UTC
+    ts_us: Mapped[int] = mapped_column(BigInteger)
+    price: Mapped[int] = mapped_column(BigInteger)
+
+
+class SchemaMeta(Base):
+    """Штамп версии схемы для быстрого старта"""
+    __tablename__ = "schema_meta"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -9,6 +9,7 @@ class CurrencyBase(BaseModel):
     code: str = Field(..., min_length=1, max_length=20)
     name: str = Field("", max_length=200)
     enabled: bool = True
+    poll_interval_seconds: Optional[int] = Field(None, ge=1, le=86400)
 
 
 class CurrencyCreate(CurrencyBase):
@@ -20,6 +21,7 @@ class CurrencyUpdate(BaseModel):
     """Обновление пары"""
     name: Optional[str] = Field(None, max_length=200)
     enabled: Optional[bool] = None
+    poll_interval_seconds: Optional[int] = Field(None, ge=1, le=86400)
 
     model_config = {"extra": "forbid"}
 
@@ -33,6 +35,68 @@ class CurrencyRead(CurrencyBase):
     model_config = {"from_attributes": True}
 
 
+class CurrencyBulkCreate(BaseModel):
+    """Массовое создание пар, on_conflict=update обновляет существующие"""
+    items: list[CurrencyCreate] = Field(..., min_length=1, max_length=5000)
+    on_conflict: Literal["skip", "update"] = "skip"
+
+
+class CurrencyBulkUpdate(BaseModel):
+    """Массовое включение или отключение пар"""
+    codes: list[str] = Field(..., min_length=1, max_length=5000)
+    enabled: bool
+
+    model_config = {"extra": "forbid"}
+
+
+class BulkConflict(BaseModel):
+    """Строка которую не удалось применить"""
+    code: str
+    reason: str
+
+
+class CurrencyBulkResult(BaseModel):
+    """Ответ массовой операции"""
+    created: list[CurrencyRead] = []
+    updated: list[CurrencyRead] = []
+    conflicts: list[BulkConflict] = []
+
+
+class AlertCreate(BaseModel):
+    """Создание оповещения
+
+    above и below срабатывают когда цена пересекает threshold
+    change_pct срабатывает когда цена отклоняется от base_value на threshold процентов
+    """
+    currency_code: str = Field(..., min_length=1, max_length=20)
+    kind: Literal["above", "below", "change_pct"]
+    threshold: float = Field(..., gt=0)
+    base_value: Optional[float] = Field(None, gt=0)
+
+
+class AlertUpdate(BaseModel):
+    """Обновление оповещения, enabled=true заново взводит сработавшее правило"""
+    threshold: Optional[float] = Field(None, gt=0)
+    base_value: Optional[float] = Field(None, gt=0)
+    enabled: Optional[bool] = None
+
+    model_config = {"extra": "forbid"}
+
+
+class AlertRead(BaseModel):
+    """Ответ с оповещением"""
+    id: int
+    currency_code: str
+    kind: str
+    threshold: float
+    base_value: Optional[float]
+    enabled: bool
+    triggered_at: Optional[datetime]
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
 class RateRead(BaseModel):
     """Ответ с ценой"""
     id: int
@@ -46,6 +110,62 @@ class RateRead(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class RateBucketRead(BaseModel):
+    """Корзина истории цен"""
+    bucket: datetime
+    open: Optional[float] = None
+    high: float
+    low: float
+    close: Optional[float] = None
+    avg: float
+    count: int
+
+
+class RateSeriesStats(BaseModel):
+    """Статистика ряда цен одной пары"""
+    code: str
+    points: int
+    first: Optional[float] = None
+    last: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    total_return: Optional[float] = None
+    mean_return: Optional[float] = None
+    volatility: Optional[float] = None
+    rolling_return: Optional[float] = None
+    rolling_volatility: Optional[float] = None
+
+
+class RateCorrelation(BaseModel):
+    """Матрица корреляций доходностей"""
+    codes: list[str]
+    matrix: list[list[Optional[float]]]
+
+
+class RateStatsRead(BaseModel):
+    """Ответ со статистикой по нескольким парам"""
+    window: int
+    rolling: int
+    last_tick_id: int
+    series: list[RateSeriesStats]
+    correlation: RateCorrelation
+
+
+class ReplayStartRequest(BaseModel):
+    """Запуск повтора истории
+
+    speed ускоряет исходный темп тиков, max_rate ограничивает событий в секунду
+    Без обоих события идут с максимальной скоростью
+    """
+    start: datetime
+    end: Optional[datetime] = None
+    codes: Optional[list[str]] = Field(None, max_length=5000)
+    speed: Optional[float] = Field(None, gt=0)
+    max_rate: Optional[float] = Field(None, gt=0)
+
+    model_config = {"extra": "forbid"}
+
+
 class NatsPublishRequest(BaseModel):
     type: str = Field(..., min_length=1, max_length=100)
     payload: Any = None
@@ -53,6 +173,8 @@ class NatsPublishRequest(BaseModel):
 
 class NatsStatusRead(BaseModel):
     connected: bool
+    degraded: bool = False
+    last_error: Optional[str] = None
     url: str
     subject: str
     source_id: str
@@ -1,44 +1,89 @@
+import asyncio
+import contextlib
 import json
+import logging
 import os
 from typing import Any, Awaitable, Callable, Optional
 from uuid import uuid4
 
-try:
-    from nats.aio.client import Client as NATS
-except Exception:
-    NATS = None
+from ..services.tracing import stamp
 
 EventHandler = Callable[[dict], Awaitable[None]]
 
+logger = logging.getLogger("currency_tracker.nats")
+
 
 class NatsClient:
     """Простой NATS-клиент"""
 
-    def __init__(self, *, url: Optional[str] = None, subject: str = "items.updates", on_event: EventHandler) -> None:
+    def __init__(
+        self,
+        *,
+        url: Optional[str] = None,
+        subject: str = "items.updates",
+        on_event: EventHandler,
+        local_fallback: bool = False,
+    ) -> None:
         self.url = url or os.getenv("NATS_URL", "nats://127.0.0.1:4222")
         self.subject = subject
         self.source_id = uuid4().hex
 
         self._on_event = on_event
         self._nc = None
+        # Без NATS события доставляются только локальным клиентам
+        self._local_fallback = local_fallback
+        self._connect_task: Optional[asyncio.Task] = None
+        self.last_error: Optional[str] = None
 
     @property
     def is_connected(self) -> bool:
         return self._nc is not None
 
+    @property
+    def is_degraded(self) -> bool:
+        return self._nc is None and self._local_fallback
+
     async def connect(self) -> None:
         if self._nc is not None:
             return
 
-        if NATS is None:
+        try:
+            from nats.aio.client import Client as NATS
+        except Exception:
             raise RuntimeError("NATS client is not installed (nats-py)")
 
         nc = NATS()
         await nc.connect(servers=[self.url], connect_timeout=1)
         await nc.subscribe(self.subject, cb=self._handle_msg)
         self._nc = nc
+        self.last_error = None
+
+    def start(self, retry_seconds: float = 1.0, max_retry_seconds: float = 30.0) -> None:
+        """Подключение в фоне с повторами, старт приложения не ждет NATS"""
+        if self._nc is not None or self._connect_task is not None:
+            return
+        self._connect_task = asyncio.create_task(
+            self._connect_loop(retry_seconds, max_retry_seconds)
+        )
+
+    async def _connect_loop(self, retry_seconds: float, max_retry_seconds: float) -> None:
+        delay = max(0.1, retry_seconds)
+        while self._nc is None:
+            try:
+                await self.connect()
+            except Exception as err:
+                self.last_error = f"{type(err).__name__}: {err}"
+                logger.warning("nats connect failed, retry in %.1fs: %s", delay, self.last_error)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_retry_seconds)
+        self._connect_task = None
 
     async def close(self) -> None:
+        if self._connect_task:
+            self._connect_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._connect_task
+            self._connect_task = None
         if not self._nc:
             return
         try:
@@ -52,7 +97,7 @@ class NatsClient:
         return event
 
     async def publish(self, event: dict) -> None:
-        if not self._nc:
+        if not self._nc and not self._local_fallback:
             return
 
         meta = event.get("meta")
@@ -61,6 +106,14 @@ class NatsClient:
         meta.setdefault("source", self.source_id)
         event["meta"] = meta
 
+        stamp(event, "published")
+
+        if not self._nc:
+            local_event = json.loads(json.dumps(event, default=str))
+            stamp(local_event, "received")
+            await self._on_event(local_event)
+            return
+
         payload = json.dumps(event, default=str).encode("utf-8")
         await self._nc.publish(self.subject, payload)
 
@@ -69,6 +122,13 @@ class NatsClient:
             event = json.loads(msg.data.decode("utf-8"))
             if not isinstance(event, dict):
                 return
+            meta = event.get("meta")
+            # Монотонные отметки имеют смысл только для своих событий
+            if isinstance(meta, dict):
+                if meta.get("source") == self.source_id:
+                    stamp(event, "received")
+                else:
+                    meta.pop("trace", None)
             await self._on_event(event)
         except Exception:
             return
@@ -0,0 +1,229 @@
+import asyncio
+import bisect
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional, Union
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ..db import crud
+from ..models.orm import Alert
+from ..models.schemas import AlertRead
+
+logger = logging.getLogger("currency_tracker.alerts")
+
+
+@dataclass
+class _CodeIndex:
+    """Уровни срабатывания одной пары, отсортированы по цене"""
+    up: list[tuple[float, int]] = field(default_factory=list)
+    down: list[tuple[float, int]] = field(default_factory=list)
+
+
+def _levels(kind: str, threshold: float, base_value: Optional[float]) -> list[tuple[str, float]]:
+    """Правило в уровни цены: вверх срабатывает при росте, вниз при падении"""
+    if kind == "above":
+        return [("up", threshold)]
+    if kind == "below":
+        return [("down", threshold)]
+    if kind == "change_pct" and base_value:
+        delta = base_value * threshold / 100
+        return [("up", base_value + delta), ("down", base_value - delta)]
+    return []
+
+
+class AlertEngine:
+    """Проверяет оповещения на каждом тике
+
+    Каждое правило превращено в уровни цены в отсортированных списках пары,
+    поэтому тик стоит O(log n + число срабатываний) а не O(число правил)
+    """
+
+    def __init__(self, session_factory: async_sessionmaker) -> None:
+        self._session_factory = session_factory
+        self._index: dict[str, _CodeIndex] = {}
+        self._rules: dict[int, dict] = {}
+        self._last_prices: dict[str, float] = {}
+
+        self.triggered_total: int = 0
+
+    async def load(self) -> None:
+        """Загрузить взведенные правила из базы"""
+        async with self._session_factory() as session:
+            alerts = await crud.list_alerts(session, armed_only=True)
+        self._index.clear()
+        self._rules.clear()
+        for alert in alerts:
+            self.add(alert)
+
+    def add(self, alert: Union[Alert, AlertRead]) -> None:
+        """Добавить или заменить правило в индексе"""
+        self.remove(alert.id)
+        if not alert.enabled or alert.triggered_at is not None:
+            return
+        self._insert(
+            alert.id, alert.currency_code.upper(), alert.kind, alert.threshold, alert.base_value
+        )
+
+    def _insert(
+        self,
+        alert_id: int,
+        code: str,
+        kind: str,
+        threshold: float,
+        base_value: Optional[float],
+    ) -> None:
+        levels = _levels(kind, threshold, base_value)
+        if not levels:
+            return
+
+        index = self._index.setdefault(code, _CodeIndex())
+        for side, level in levels:
+            bisect.insort(getattr(index, side), (level, alert_id))
+        self._rules[alert_id] = {
+            "id": alert_id,
+            "currency_code": code,
+            "kind": kind,
+            "threshold": threshold,
+            "base_value": base_value,
+            "levels": levels,
+        }
+
+    def remove(self, alert_id: int) -> None:
+        """Убрать правило из индекса"""
+        rule = self._rules.pop(alert_id, None)
+        if rule is None:
+            return
+        index = self._index.get(rule["currency_code"])
+        if index is None:
+            return
+        for side, level in rule["levels"]:
+            levels = getattr(index, side)
+            pos = bisect.bisect_left(levels, (level, alert_id))
+            if pos < len(levels) and levels[pos] == (level, alert_id):
+                levels.pop(pos)
+        if not index.up and not index.down:
+            self._index.pop(rule["currency_code"], None)
+
+    def last_price(self, code: str) -> Optional[float]:
+        """Последняя цена пары которую видел движок"""
+        return self._last_prices.get(code.upper())
+
+    def evaluate(self, prices: dict[str, float]) -> list[dict]:
+        """Найти правила, уровень которых цена пересекла с прошлого тика"""
+        hits: list[dict] = []
+        for code, price in prices.items():
+            code = code.upper()
+            previous = self._last_prices.get(code)
+            self._last_prices[code] = price
+
+            index = self._index.get(code)
+            if index is None or previous is None or price == previous:
+                continue
+
+            if price > previous:
+                # Уровни в интервале (previous, price]
+                levels = index.up
+                lo = bisect.bisect_right(levels, (previous, float("inf")))
+                hi = bisect.bisect_right(levels, (price, float("inf")))
+                direction = "up"
+            else:
+                # Уровни в интервале [price, previous)
+                levels = index.down
+                lo = bisect.bisect_left(levels, (price, -1))
+                hi = bisect.bisect_left(levels, (previous, -1))
+                direction = "down"
+
+            for level, alert_id in levels[lo:hi]:
+                rule = self._rules.get(alert_id)
+                if rule is None:
+                    continue
+                hits.append(
+                    {
+                        "id": alert_id,
+                        "currency_code": code,
+                        "kind": rule["kind"],
+                        "threshold": rule["threshold"],
+                        "base_value": rule["base_value"],
+                        "level": level,
+                        "direction": direction,
+                        "previous": previous,
+                        "price": price,
+                    }
+                )
+
+        # Правила одноразовые, после срабатывания уходят из индекса
+        for hit in hits:
+            self.remove(hit["id"])
+        self.triggered_total += len(hits)
+        return hits
+
+    def handle_event(self, event: dict) -> None:
+        """Применить изменение правил, сделанное на любой реплике
+
+        Индекс свой у каждого процесса, поэтому API рассылает alerts_changed через
+        NATS, а сработавшее на другой реплике правило снимается по alert_triggered
+        """
+        payload = event.get("payload")
+        if not isinstance(payload, dict) or not isinstance(payload.get("id"), int):
+            return
+        if event.get("type") == "alert_triggered":
+            self.remove(payload["id"])
+        elif event.get("type") == "alerts_changed":
+            alert = payload.get("alert")
+            if alert is None:
+                self.remove(payload["id"])
+            else:
+                self.add(AlertRead.model_validate(alert))
+
+    async def mark_triggered(
+        self, hits: list[dict], *, attempts: int = 3, retry_seconds: float = 0.2
+    ) -> list[dict]:
+        """Сохранить срабатывания в базу и вернуть сохраненные
+
+        Если запись так и не удалась, правила возвращаются в индекс. В базе они
+        остались взведенными, и иначе сработали бы второй раз после рестарта
+        """
+        if not hits:
+            return []
+        triggered_at = datetime.now(timezone.utc)
+        for attempt in range(1, attempts + 1):
+            try:
+                async with self._session_factory() as session:
+                    await crud.mark_alerts_triggered(
+                        session, [hit["id"] for hit in hits], triggered_at
+                    )
+                break
+            except Exception as err:
+                logger.warning(
+                    "failed to store triggered alerts (attempt %d): %s: %s",
+                    attempt,
+                    type(err).__name__,
+                    err,
+                )
+                if attempt < attempts:
+                    await asyncio.sleep(retry_seconds * 2 ** (attempt - 1))
+        else:
+            for hit in hits:
+                self._insert(
+                    hit["id"],
+                    hit["currency_code"],
+                    hit["kind"],
+                    hit["threshold"],
+                    hit["base_value"],
+                )
+            self.triggered_total -= len(hits)
+            return []
+
+        for hit in hits:
+            hit["triggered_at"] = triggered_at
+        return hits
+
+    def status(self) -> dict:
+        """Статистика индекса"""
+        return {
+            "armed": len(self._rules),
+            "codes": len(self._index),
+            "triggered_total": self.triggered_total,
+        }
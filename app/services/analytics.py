@@ -0,0 +1,127 @@
+import asyncio
+import math
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ..db import crud
+
+Series = dict[str, list[tuple[int, float]]]
+
+
+def _clean(value) -> Optional[float]:
+    """NaN и inf не сериализуются в JSON"""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def compute_stats(series: Series, rolling: int) -> dict:
+    """Статистика по рядам цен, считается векторно в NumPy"""
+    import numpy as np
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _compute_stats(np, series, rolling)
+
+
+def _compute_stats(np, series: Series, rolling: int) -> dict:
+    stats = []
+    arrays: dict[str, tuple] = {}
+    for code, points in series.items():
+        ts = np.fromiter((p[0] for p in points), dtype=np.int64, count=len(points))
+        values = np.fromiter((p[1] for p in points), dtype=np.float64, count=len(points))
+        # Одна цена на момент времени даже если источников несколько
+        ts, index = np.unique(ts, return_index=True)
+        values = values[index]
+        arrays[code] = (ts, values)
+
+        item: dict = {"code": code, "points": int(values.size)}
+        if values.size:
+            item.update(
+                first=_clean(values[0]),
+                last=_clean(values[-1]),
+                min=_clean(values.min()),
+                max=_clean(values.max()),
+            )
+        if values.size >= 2:
+            returns = np.diff(values) / values[:-1]
+            item.update(
+                total_return=_clean(values[-1] / values[0] - 1),
+                mean_return=_clean(returns.mean()),
+                volatility=_clean(returns.std(ddof=1)) if returns.size >= 2 else None,
+            )
+            if values.size > rolling:
+                rolling_returns = values[rolling:] / values[:-rolling] - 1
+                item["rolling_return"] = _clean(rolling_returns[-1])
+                if rolling >= 2:
+                    item["rolling_volatility"] = _clean(returns[-rolling:].std(ddof=1))
+        stats.append(item)
+
+    codes = list(arrays)
+    matrix: list[list[Optional[float]]] = [[None] * len(codes) for _ in codes]
+    if len(codes) >= 2:
+        # Корреляция доходностей только по общим моментам времени
+        common = arrays[codes[0]][0]
+        for code in codes[1:]:
+            common = np.intersect1d(common, arrays[code][0], assume_unique=True)
+        if common.size >= 3:
+            aligned = np.vstack(
+                [values[np.searchsorted(ts, common)] for ts, values in arrays.values()]
+            )
+            returns = np.diff(aligned, axis=1) / aligned[:, :-1]
+            corr = np.corrcoef(returns)
+            matrix = [[_clean(v) for v in row] for row in np.atleast_2d(corr)]
+
+    return {"series": stats, "correlation": {"codes": codes, "matrix": matrix}}
+
+
+class RatesAnalytics:
+    """Аналитика по истории цен с LRU кэшем на последний тик"""
+
+    def __init__(
+        self, session_factory: async_sessionmaker, *, cache_size: int = 128
+    ) -> None:
+        self._session_factory = session_factory
+        self._cache_size = max(1, cache_size)
+        self._cache: OrderedDict[tuple, dict] = OrderedDict()
+
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+
+    async def stats(self, codes: list[str], window: int, rolling: int) -> dict:
+        """Статистика по последним window точкам каждой пары"""
+        codes_key = tuple(
+            dict.fromkeys(code.strip().upper() for code in codes if code.strip())
+        )
+
+        async with self._session_factory() as session:
+            last_tick_id = await crud.get_last_rate_id(session)
+            key = (codes_key, window, rolling, last_tick_id)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+
+            series = {
+                code: await crud.list_rate_series(session, code, window) for code in codes_key
+            }
+
+        self.cache_misses += 1
+        # Расчет в пуле потоков чтобы не блокировать event loop
+        result = await asyncio.to_thread(compute_stats, series, rolling)
+        result.update(window=window, rolling=rolling, last_tick_id=last_tick_id)
+
+        self._cache[key] = result
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def status(self) -> dict:
+        """Статистика кэша"""
+        return {
+            "cache_size": len(self._cache),
+            "cache_max": self._cache_size,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
@@ -0,0 +1,169 @@
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger("currency_tracker.tracing")
+
+# Этапы пути тика от Binance до браузера по порядку
+# С писателем тик только ставится в очередь (enqueued), без него сразу коммитится (stored)
+STAGES = ("fetched", "enqueued", "stored", "published", "received", "fanned_out")
+
+
+def stamp(event: dict, stage: str, at_ns: Optional[int] = None) -> None:
+    """Отметить в meta.trace события момент этапа по монотонным часам"""
+    meta = event.get("meta")
+    if not isinstance(meta, dict):
+        meta = {}
+        event["meta"] = meta
+    trace = meta.get("trace")
+    if not isinstance(trace, dict):
+        trace = {}
+        meta["trace"] = trace
+    trace[stage] = at_ns if at_ns is not None else time.monotonic_ns()
+
+
+def _trace_of(event: dict) -> Optional[dict]:
+    meta = event.get("meta")
+    if not isinstance(meta, dict):
+        return None
+    trace = meta.get("trace")
+    return trace if isinstance(trace, dict) else None
+
+
+def is_traced(event: dict) -> bool:
+    """Есть ли у события отметки этапов этого процесса"""
+    return bool(_trace_of(event))
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class _OtelExporter:
+    """Экспорт этапов в OpenTelemetry спанами, в коллектор OTLP или в файл"""
+
+    def __init__(self, mode: str, path: str) -> None:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        self._file = None
+        if mode == "otlp":
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+            exporter = OTLPSpanExporter()
+        else:
+            from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+            self._file = open(path, "a", encoding="utf-8")
+            exporter = ConsoleSpanExporter(
+                out=self._file, formatter=lambda span: span.to_json(indent=None) + "\n"
+            )
+
+        self._provider = TracerProvider(
+            resource=Resource.create({"service.name": "currency-tracker"})
+        )
+        self._provider.add_span_processor(BatchSpanProcessor(exporter))
+        self._tracer = self._provider.get_tracer("currency_tracker.tracing")
+        # Спаны требуют время epoch, этапы записаны по монотонным часам
+        self._offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def export(self, event_type: str, points: list[tuple[str, int]]) -> None:
+        from opentelemetry import trace
+
+        start_ns, end_ns = points[0][1], points[-1][1]
+        root = self._tracer.start_span(event_type, start_time=start_ns + self._offset_ns)
+        context = trace.set_span_in_context(root)
+        for (stage_from, at_from), (stage_to, at_to) in zip(points, points[1:]):
+            span = self._tracer.start_span(
+                f"{stage_from}->{stage_to}",
+                context=context,
+                start_time=at_from + self._offset_ns,
+            )
+            span.end(end_time=at_to + self._offset_ns)
+        root.end(end_time=end_ns + self._offset_ns)
+
+    def shutdown(self) -> None:
+        self._provider.shutdown()
+        if self._file is not None:
+            self._file.close()
+
+
+class LatencyTracker:
+    """Перцентили задержек между этапами по последним событиям"""
+
+    def __init__(self, *, window: int = 2048, export: str = "", export_path: str = "") -> None:
+        self._window = window
+        self._samples: dict[str, deque[float]] = {}
+        self.recorded: int = 0
+        self.skipped: int = 0
+
+        self._exporter: Optional[_OtelExporter] = None
+        if export:
+            try:
+                self._exporter = _OtelExporter(export, export_path or "traces.jsonl")
+            except Exception as err:
+                logger.warning("span export disabled: %s: %s", type(err).__name__, err)
+
+    def record(self, event: dict) -> None:
+        """Учесть событие которое прошло все свои этапы"""
+        trace = _trace_of(event)
+        if not trace:
+            return
+
+        points = [
+            (stage, trace[stage]) for stage in STAGES if isinstance(trace.get(stage), int)
+        ]
+        if len(points) < 2:
+            return
+        # Монотонные часы сравнимы только в пределах одной машины
+        if any(b[1] < a[1] for a, b in zip(points, points[1:])):
+            self.skipped += 1
+            return
+
+        for (stage_from, at_from), (stage_to, at_to) in zip(points, points[1:]):
+            self._add(f"{stage_from}->{stage_to}", (at_to - at_from) / 1e6)
+        self._add(f"{points[0][0]}->{points[-1][0]}", (points[-1][1] - points[0][1]) / 1e6)
+        self.recorded += 1
+
+        if self._exporter is not None:
+            try:
+                self._exporter.export(str(event.get("type", "event")), points)
+            except Exception as err:
+                logger.warning("span export failed: %s: %s", type(err).__name__, err)
+
+    def observe(self, name: str, value_ms: float) -> None:
+        """Учесть задержку, которая не входит в путь события, например коммит писателя"""
+        self._add(name, value_ms)
+
+    def _add(self, name: str, value_ms: float) -> None:
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self._window)
+        samples.append(value_ms)
+
+    def snapshot(self) -> dict:
+        """Перцентили в миллисекундах по каждому переходу между этапами"""
+        stages = {}
+        for name, samples in self._samples.items():
+            ordered = sorted(samples)
+            stages[name] = {
+                "count": len(ordered),
+                "p50_ms": round(_percentile(ordered, 0.50), 3),
+                "p90_ms": round(_percentile(ordered, 0.90), 3),
+                "p99_ms": round(_percentile(ordered, 0.99), 3),
+                "max_ms": round(ordered[-1], 3),
+            }
+        return {
+            "window": self._window,
+            "recorded": self.recorded,
+            "skipped": self.skipped,
+            "exporting": self._exporter is not None,
+            "stages": stages,
+        }
+
+    def shutdown(self) -> None:
+        if self._exporter is not None:
+            self._exporter.shutdown()
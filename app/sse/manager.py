@@ -0,0 +1,173 @@
+import asyncio
+import json
+from collections import deque
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+
+# Ключи по которым событие относится к паре
+_CODE_KEYS = ("currency_code", "code")
+
+
+def _row_code(row) -> Optional[str]:
+    if isinstance(row, dict):
+        for key in _CODE_KEYS:
+            value = row.get(key)
+            if isinstance(value, str):
+                return value.upper()
+    return None
+
+
+def filter_event(event: dict, codes: frozenset[str]) -> Optional[dict]:
+    """Оставить в событии только нужные пары, None если событие не подходит
+
+    События без кода пары доставляются всем
+    """
+    payload = event.get("payload")
+    if isinstance(payload, list):
+        rows = [row for row in payload if _row_code(row) is not None]
+        if not rows:
+            return event
+        matched = [row for row in rows if _row_code(row) in codes]
+        return {**event, "payload": matched} if matched else None
+
+    code = _row_code(payload)
+    if code is None:
+        return event
+    return event if code in codes else None
+
+
+class _Subscriber:
+    """Очередь одного SSE клиента с уже сериализованными сообщениями"""
+
+    __slots__ = ("codes", "queue", "overflowed")
+
+    def __init__(self, codes: Optional[frozenset[str]], queue_size: int) -> None:
+        self.codes = codes
+        self.queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+
+class EventStreamManager:
+    """Рассылка событий по SSE с кольцевым буфером для Last-Event-ID
+
+    id события имеет вид <boot>-<n>, boot свой у каждого процесса. Так id после
+    рестарта или с другой реплики не путается со своим счетчиком
+    """
+
+    def __init__(
+        self,
+        *,
+        buffer_size: int = 1000,
+        queue_size: int = 100,
+        heartbeat_seconds: float = 15.0,
+        retry_ms: int = 3000,
+    ) -> None:
+        self._buffer: deque[tuple[int, dict, str]] = deque(maxlen=buffer_size)
+        self._subscribers: set[_Subscriber] = set()
+        self.boot_id = uuid4().hex[:8]
+        self._next_id = 1
+        self._queue_size = queue_size
+        self._heartbeat = heartbeat_seconds
+        self._retry_ms = retry_ms
+
+        self.dropped_clients: int = 0
+
+    async def broadcast(self, message: dict) -> None:
+        """Кладет событие в буфер и в очереди подписчиков"""
+        event = jsonable_encoder(message)
+        event_id = self._next_id
+        self._next_id += 1
+        data = json.dumps(event, ensure_ascii=False)
+        self._buffer.append((event_id, event, data))
+
+        for sub in list(self._subscribers):
+            frame = self._frame_for(sub, event_id, event, data)
+            if frame is None:
+                continue
+            try:
+                sub.queue.put_nowait((event_id, frame))
+            except asyncio.QueueFull:
+                # Медленный клиент отключается и переподключится с Last-Event-ID
+                sub.overflowed = True
+                self._subscribers.discard(sub)
+                self.dropped_clients += 1
+
+    def _frame_for(
+        self, sub: _Subscriber, event_id: int, event: dict, data: str
+    ) -> Optional[str]:
+        if sub.codes:
+            filtered = filter_event(event, sub.codes)
+            if filtered is None:
+                return None
+            if filtered is not event:
+                data = json.dumps(filtered, ensure_ascii=False)
+        return f"id: {self.boot_id}-{event_id}\ndata: {data}\n\n"
+
+    def _parse_id(self, raw: str) -> Optional[int]:
+        """Номер события этого процесса или None если id чужой"""
+        boot, _, number = raw.strip().rpartition("-")
+        if boot != self.boot_id or not number.isdigit():
+            return None
+        event_id = int(number)
+        return event_id if event_id < self._next_id else None
+
+    async def stream(
+        self,
+        request: Request,
+        *,
+        codes: Optional[frozenset[str]] = None,
+        last_event_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Поток SSE одного клиента"""
+        sub = _Subscriber(codes, self._queue_size)
+        self._subscribers.add(sub)
+        try:
+            yield f"retry: {self._retry_ms}\n\n"
+
+            last_sent = 0
+            if last_event_id is not None:
+                resume_from = self._parse_id(last_event_id)
+                oldest = self._buffer[0][0] if self._buffer else self._next_id
+                if resume_from is None or resume_from + 1 < oldest:
+                    # id от другого процесса или часть событий уже вытеснена из буфера
+                    gap = {"type": "resync", "payload": {"last_event_id": last_event_id}}
+                    yield f"data: {json.dumps(gap)}\n\n"
+                if resume_from is not None:
+                    last_sent = resume_from
+                    for event_id, event, data in list(self._buffer):
+                        if event_id <= resume_from:
+                            continue
+                        frame = self._frame_for(sub, event_id, event, data)
+                        if frame is not None:
+                            yield frame
+                        last_sent = event_id
+            else:
+                yield 'data: {"type": "welcome", "payload": "connected"}\n\n'
+
+            while not sub.overflowed:
+                try:
+                    event_id, frame = await asyncio.wait_for(sub.queue.get(), self._heartbeat)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if event_id <= last_sent:
+                    continue
+                last_sent = event_id
+                yield frame
+        finally:
+            self._subscribers.discard(sub)
+
+    def status(self) -> dict:
+        """Статистика SSE"""
+        return {
+            "clients": len(self._subscribers),
+            "buffered": len(self._buffer),
+            "boot_id": self.boot_id,
+            "last_event_id": self._next_id - 1,
+            "dropped_clients": self.dropped_clients,
+        }
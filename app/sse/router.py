@@ -0,0 +1,33 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+router = APIRouter(tags=["events"])
+
+
+@router.get("/events")
+async def events_stream(
+    request: Request,
+    codes: Optional[str] = Query(None, description="Коды пар через запятую"),
+    last_event_id: Optional[str] = Query(None, max_length=64),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """Server-Sent Events с теми же событиями что и WebSocket"""
+    code_filter = None
+    if codes:
+        code_filter = frozenset(c.strip().upper() for c in codes.split(",") if c.strip())
+
+    # Браузер при переподключении присылает заголовок, query нужен для первого запроса
+    resume_from = last_event_id_header or last_event_id
+
+    return StreamingResponse(
+        request.app.state.events.stream(
+            request, codes=code_filter or None, last_event_id=resume_from
+        ),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache, no-transform",
+            "X-Accel-Buffering": "no",
+        },
+    )
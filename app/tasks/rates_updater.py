@@ -1,17 +1,33 @@
 import asyncio
 import contextlib
+import json
 import logging
+import random
+import time
 from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 from typing import Awaitable, Callable, Optional
 
-import httpx
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from ..db import crud
+from ..db.writer import RatesWriter
 from ..models import schemas
+from ..models.orm import Currency
+from ..services.alerts import AlertEngine
+from ..services.tracing import stamp
+from .scheduler import PollScheduler
 
 NotifyFn = Callable[[dict], Awaitable[None]]
 
+# Binance отвечает 429 при превышении лимита и 418 при бане IP
+RATE_LIMIT_STATUSES = (418, 429)
+MAX_BACKOFF_SECONDS = 600.0
+# Сколько символов запрашивать одним запросом ?symbols=[...]
+BATCH_SYMBOLS = 100
+# Символ, на который Binance ответил 400, не запрашивается это время
+REJECTED_TTL_SECONDS = 3600.0
+
 logger = logging.getLogger("currency_tracker.rates")
 
 
@@ -36,15 +52,28 @@ class RatesUpdater:
         session_factory: async_sessionmaker,
         notifier: Optional[NotifyFn] = None,
         *,
+        writer: Optional[RatesWriter] = None,
+        alerts: Optional[AlertEngine] = None,
         interval_seconds: int = 60,
         source_url: str = "https://api.binance.com/api/v3/ticker/price",
         source_name: str = "binance",
+        first_delay_seconds: float = 0.0,
+        first_jitter_seconds: float = 0.0,
     ) -> None:
         self._session_factory = session_factory
         self._notifier = notifier
+        self._writer = writer
+        self._alerts = alerts
         self._interval = interval_seconds
         self._source_url = source_url
         self._source_name = source_name
+        self._first_delay = max(0.0, first_delay_seconds)
+        self._first_jitter = max(0.0, first_jitter_seconds)
+
+        self._scheduler = PollScheduler(interval_seconds)
+        self._backoff = 0.0
+        # Символ -> момент time.time() когда Binance его отверг
+        self._rejected: dict[str, float] = {}
 
         self._task: Optional[asyncio.Task] = None
         self._running = False
@@ -53,6 +82,7 @@ class RatesUpdater:
         self.last_inserted: int = 0
         self.last_error: Optional[str] = None
         self.last_note: Optional[str] = None
+        self._fetched_ns: Optional[int] = None
 
     async def start(self) -> None:
         """Запуск фоновой задачи"""
@@ -75,16 +105,58 @@ class RatesUpdater:
 
     async def _worker(self) -> None:
         """Цикл фоновой задачи"""
+        # Сдвиг первого тика чтобы реплики не ходили в Binance одновременно
+        first_delay = self._first_delay + random.uniform(0, self._first_jitter)
+        if first_delay > 0:
+            await asyncio.sleep(first_delay)
+
         while self._running:
             try:
-                await self._fetch_and_store()
+                currencies = await self._load_currencies()
+                self._scheduler.sync(
+                    {c.code.upper(): c.poll_interval_seconds for c in currencies if c.enabled},
+                    time.time(),
+                )
+                due = self._scheduler.pop_due(time.time())
+                if due:
+                    # Все пары с общим моментом опроса уходят одной пачкой
+                    await self._fetch_and_store(only=set(due), currencies=currencies)
             except Exception as err:
                 self.last_error = f"{type(err).__name__}: {err}"
                 logger.warning("rates updater failed: %s", self.last_error)
-            await asyncio.sleep(self._interval)
+            await asyncio.sleep(self._sleep_seconds())
 
-    async def _fetch_and_store(self) -> int:
-        """Загрузка цен и сохранение в базу"""
+    def _sleep_seconds(self) -> float:
+        """Сон до следующего опроса, но не дольше интервала по умолчанию
+
+        Раз в интервал список пар перечитывается и новые пары попадают в расписание
+        """
+        next_due = self._scheduler.next_due()
+        if next_due is None:
+            return self._interval
+        return min(max(0.0, next_due - time.time()), self._interval)
+
+    async def _load_currencies(self) -> list[Currency]:
+        """Список пар, на первом запуске добавляет популярные"""
+        # Сессия писателя закрывается до сетевого запроса и не держит соединение
+        async with self._session_factory() as session:
+            currencies = await crud.list_currencies(session)
+
+            existing_codes = {c.code.upper() for c in currencies}
+            missing = [code for code in DEFAULT_COINS if code not in existing_codes]
+            for code in missing:
+                await crud.create_currency(
+                    session,
+                    schemas.CurrencyCreate(code=code, name=DEFAULT_COINS[code], enabled=True),
+                )
+            if missing:
+                currencies = await crud.list_currencies(session)
+        return currencies
+
+    async def _fetch_and_store(
+        self, only: Optional[set[str]] = None, currencies: Optional[list[Currency]] = None
+    ) -> int:
+        """Загрузка цен и сохранение в базу, only ограничивает набор пар"""
         fetched_at = datetime.now(timezone.utc)
         if self.last_run_at and fetched_at <= self.last_run_at:
             fetched_at = self.last_run_at + timedelta(microseconds=1)
@@ -94,65 +166,76 @@ class RatesUpdater:
         self.last_note = None
         inserted: list[dict] = []
 
-        async with self._session_factory() as session:
-            currencies = await crud.list_currencies(session)
-
-            # На первом запуске добавляем популярные пары
-            existing_codes = {c.code.upper() for c in currencies}
-            for code, name in DEFAULT_COINS.items():
-                if code not in existing_codes:
-                    await crud.create_currency(
-                        session,
-                        schemas.CurrencyCreate(code=code, name=name, enabled=True),
-                    )
-            currencies = await crud.list_currencies(session)
-
-            symbols = [c.code.upper() for c in currencies if c.enabled]
-            if not symbols:
-                self.last_inserted = 0
-                self.last_note = "нет включенных пар"
-                return 0
+        if currencies is None:
+            currencies = await self._load_currencies()
+        if only is not None:
+            currencies = [c for c in currencies if c.code.upper() in only]
 
-            prices = await self._fetch_remote_prices(symbols)
-            if not prices:
-                self.last_inserted = 0
-                if not self.last_error:
-                    self.last_error = "не удалось получить цены проверь сеть и символы"
-                return 0
+        symbols = [c.code.upper() for c in currencies if c.enabled]
+        if not symbols:
+            self.last_inserted = 0
+            self.last_note = "нет включенных пар"
+            return 0
 
-            for currency in currencies:
-                if not currency.enabled:
-                    continue
-
-                code = currency.code.upper()
-                price_raw = prices.get(code)
-                if not price_raw:
-                    continue
-
-                nominal = 1
-                value = float(price_raw)
-
-                rate = await crud.create_rate(
-                    session,
-                    currency_code=code,
-                    nominal=nominal,
-                    value=value,
-                    fetched_at=fetched_at,
-                    source=self._source_name,
-                )
-                inserted.append(
-                    {
-                        "id": rate.id,
-                        "currency_code": rate.currency_code,
-                        "nominal": rate.nominal,
-                        "value": rate.value,
-                        "fetched_at": rate.fetched_at,
-                        "source": rate.source,
-                    }
-                )
+        prices = await self._fetch_remote_prices(symbols)
+        if not prices:
+            self.last_inserted = 0
+            if not self.last_error:
+                self.last_error = "не удалось получить цены проверь сеть и символы"
+            return 0
+
+        rows: list[dict] = []
+        for currency in currencies:
+            if not currency.enabled:
+                continue
+
+            code = currency.code.upper()
+            price_raw = prices.get(code)
+            if not price_raw:
+                continue
+
+            rows.append(
+                {
+                    "currency_code": code,
+                    "nominal": 1,
+                    # Точная цена из строки Binance, float только в событии
+                    "value": Decimal(price_raw),
+                    "fetched_at": fetched_at,
+                    "source": self._source_name,
+                }
+            )
+
+        if self._writer is not None:
+            # Коммит делает писатель а событие уходит сразу, id строки еще нет
+            await self._writer.put_many(rows)
+            inserted = [{"id": None, **row, "value": float(row["value"])} for row in rows]
+        elif rows:
+            async with self._session_factory() as session:
+                for row in rows:
+                    rate = await crud.create_rate(
+                        session, **{**row, "value": float(row["value"])}
+                    )
+                    inserted.append(
+                        {
+                            "id": rate.id,
+                            "currency_code": rate.currency_code,
+                            "nominal": rate.nominal,
+                            "value": rate.value,
+                            "fetched_at": rate.fetched_at,
+                            "source": rate.source,
+                        }
+                    )
+        stored_ns = time.monotonic_ns()
 
         if inserted and self._notifier:
-            await self._notifier({"type": "rates_updated", "payload": inserted})
+            event = {"type": "rates_updated", "payload": inserted}
+            stamp(event, "fetched", self._fetched_ns)
+            # Коммит писателя учитывается отдельно как enqueued->committed
+            stamp(event, "enqueued" if self._writer is not None else "stored", stored_ns)
+            await self._notifier(event)
+
+        if inserted and self._alerts is not None:
+            await self._check_alerts(inserted)
 
         self.last_inserted = len(inserted)
         if self.last_inserted == 0:
@@ -160,39 +243,119 @@ class RatesUpdater:
 
         return len(inserted)
 
+    async def _check_alerts(self, inserted: list[dict]) -> None:
+        """Проверка оповещений по только что сохраненным ценам"""
+        hits = self._alerts.evaluate(
+            {row["currency_code"]: float(row["value"]) for row in inserted}
+        )
+        if not hits:
+            return
+        stored = await self._alerts.mark_triggered(hits)
+        if self._notifier:
+            for hit in stored:
+                await self._notifier({"type": "alert_triggered", "payload": hit})
+
     async def _fetch_remote_prices(self, symbols: list[str]) -> dict[str, str]:
-        """Загрузка цен с Binance"""
+        """Загрузка цен с Binance пачками по BATCH_SYMBOLS символов"""
+        import httpx
+
         symbols_norm = [s.strip().upper() for s in symbols if s and s.strip()]
         if not symbols_norm:
             symbols_norm = list(DEFAULT_COINS.keys())
 
-        prices: dict[str, str] = {}
+        # Отвергнутые символы не портят пачки, через REJECTED_TTL_SECONDS пробуем снова
+        now = time.time()
+        for symbol, rejected_at in list(self._rejected.items()):
+            if now - rejected_at > REJECTED_TTL_SECONDS:
+                del self._rejected[symbol]
+        symbols_norm = [s for s in symbols_norm if s not in self._rejected]
+        if not symbols_norm:
+            self.last_error = "все символы отвергнуты Binance"
+            return {}
 
-        async def fetch_one(client: httpx.AsyncClient, symbol: str) -> None:
-            """Получить цену одной пары"""
+        prices: dict[str, str] = {}
+        retry_after: list[float] = []
+
+        def rate_limited(response: "httpx.Response") -> bool:
+            """Запомнить 429/418 и Retry-After"""
+            if response.status_code not in RATE_LIMIT_STATUSES:
+                return False
+            header = response.headers.get("Retry-After", "")
+            retry_after.append(float(header) if header.isdigit() else 0.0)
+            return True
+
+        async def fetch_batch(client: "httpx.AsyncClient", batch: list[str]) -> None:
+            """Цены пачки одним запросом
+
+            Один неизвестный символ дает 400 на всю пачку, тогда пачка делится
+            пополам, пока плохой символ не останется один и не будет запомнен
+            """
+            if retry_after:
+                return
+            if len(batch) == 1:
+                params = {"symbol": batch[0]}
+            else:
+                params = {"symbols": json.dumps(batch, separators=(",", ":"))}
             try:
-                response = await client.get(self._source_url, params={"symbol": symbol})
-                response.raise_for_status()
-                data = response.json()
-                if isinstance(data, dict) and isinstance(data.get("price"), str):
-                    prices[symbol] = data["price"]
+                response = await client.get(self._source_url, params=params)
             except Exception:
-                # Если символ не существует или есть ошибка просто пропускаем
+                # Сеть вернется к следующему тику, дробить пачку нет смысла
+                return
+            if rate_limited(response):
+                return
+            if response.status_code == 400:
+                if len(batch) == 1:
+                    self._rejected[batch[0]] = time.time()
+                    logger.warning("binance rejected symbol %s", batch[0])
+                    return
+                middle = len(batch) // 2
+                await asyncio.gather(
+                    fetch_batch(client, batch[:middle]), fetch_batch(client, batch[middle:])
+                )
+                return
+            if response.status_code != 200:
+                return
+            try:
+                data = response.json()
+            except ValueError:
                 return
+            for item in data if isinstance(data, list) else [data]:
+                if isinstance(item, dict) and isinstance(item.get("price"), str):
+                    prices[item["symbol"]] = item["price"]
 
         try:
             async with httpx.AsyncClient(timeout=10) as client:
-                await asyncio.gather(*(fetch_one(client, s) for s in symbols_norm))
+                await asyncio.gather(
+                    *(
+                        fetch_batch(client, symbols_norm[i : i + BATCH_SYMBOLS])
+                        for i in range(0, len(symbols_norm), BATCH_SYMBOLS)
+                    )
+                )
         except Exception as err:
             self.last_error = f"{type(err).__name__}: {err}"
             return {}
 
+        if retry_after:
+            self._back_off(max(retry_after))
+        else:
+            self._backoff = 0.0
+
         if not prices:
-            self.last_error = "цены не получены проверь сеть и символы"
+            if not retry_after:
+                self.last_error = "цены не получены проверь сеть и символы"
             return {}
 
+        self._fetched_ns = time.monotonic_ns()
         return prices
 
+    def _back_off(self, retry_after: float) -> None:
+        """Пауза опроса после ответа 429/418"""
+        self._backoff = min(MAX_BACKOFF_SECONDS, max(self._backoff * 2, float(self._interval)))
+        delay = max(retry_after, self._backoff)
+        self._scheduler.pause(time.time() + delay)
+        self.last_error = f"Binance rate limit, пауза {delay:.0f} с"
+        logger.warning("rates updater rate limited, pausing for %.0fs", delay)
+
     def status(self) -> dict:
         """Статус фоновой задачи для отладки"""
         return {
@@ -204,4 +367,6 @@ class RatesUpdater:
             "last_inserted": self.last_inserted,
             "last_error": self.last_error,
             "last_note": self.last_note,
+            "scheduler": self._scheduler.status(),
+            "rejected_symbols": sorted(self._rejected),
         }
@@ -0,0 +1,185 @@
+import asyncio
+import contextlib
+import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ..db import crud
+
+NotifyFn = Callable[[dict], Awaitable[None]]
+
+logger = logging.getLogger("currency_tracker.replay")
+
+
+def _as_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def _seconds(moment: datetime) -> float:
+    return _as_utc(moment).timestamp()
+
+
+class RatesReplayer:
+    """Повторно отправляет сохраненные тики как события rates_updated
+
+    Строки одного момента времени собираются в одно событие, как у живого тика.
+    Темп задает speed (ускорение относительно исходного времени) и/или
+    max_rate (не больше событий в секунду)
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        notifier: NotifyFn,
+        *,
+        chunk_size: int = 1000,
+    ) -> None:
+        self._session_factory = session_factory
+        self._notifier = notifier
+        self._chunk_size = chunk_size
+
+        self._task: Optional[asyncio.Task] = None
+        self._params: dict = {}
+
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.events_sent: int = 0
+        self.rows_sent: int = 0
+        self.position: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(
+        self,
+        start: datetime,
+        end: Optional[datetime] = None,
+        *,
+        codes: Optional[list[str]] = None,
+        speed: Optional[float] = None,
+        max_rate: Optional[float] = None,
+    ) -> None:
+        """Запуск повтора, одновременно идет только один"""
+        if self.is_running:
+            raise RuntimeError("replay is already running")
+
+        self._params = {
+            "start": _as_utc(start),
+            "end": _as_utc(end),
+            "codes": [code.upper() for code in codes] if codes else None,
+            "speed": speed,
+            "max_rate": max_rate,
+        }
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at = None
+        self.events_sent = 0
+        self.rows_sent = 0
+        self.position = None
+        self.last_error = None
+        self._task = asyncio.create_task(self._run(**self._params))
+
+    async def stop(self) -> None:
+        """Остановка повтора"""
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(
+        self,
+        start: datetime,
+        end: Optional[datetime],
+        codes: Optional[list[str]],
+        speed: Optional[float],
+        max_rate: Optional[float],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        wall_start = loop.time()
+        first_tick: Optional[float] = None
+        batch: list[dict] = []
+        batch_at: Optional[datetime] = None
+
+        async def send() -> None:
+            nonlocal first_tick
+            tick = _seconds(batch_at)
+            if first_tick is None:
+                first_tick = tick
+
+            # Цель считается от начала повтора, поэтому ошибки сна не копятся
+            target = wall_start
+            if speed:
+                target = max(target, wall_start + (tick - first_tick) / speed)
+            if max_rate:
+                target = max(target, wall_start + self.events_sent / max_rate)
+            delay = target - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await self._notifier(
+                {"type": "rates_updated", "payload": batch, "meta": {"replay": True}}
+            )
+            self.events_sent += 1
+            self.rows_sent += len(batch)
+            self.position = batch_at
+
+        try:
+            async for row in self._rows(start, end, codes):
+                if batch and row["fetched_at"] != batch_at:
+                    await send()
+                    batch = []
+                batch_at = row["fetched_at"]
+                batch.append(row)
+            if batch:
+                await send()
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            self.last_error = f"{type(err).__name__}: {err}"
+            logger.warning("replay failed: %s", self.last_error)
+        finally:
+            self.finished_at = datetime.now(timezone.utc)
+
+    async def _rows(
+        self, start: datetime, end: Optional[datetime], codes: Optional[list[str]]
+    ) -> AsyncIterator[dict]:
+        """Строки периода по страницам, каждая страница в своей короткой сессии
+
+        Сессия не живет весь повтор, иначе SQLite не может сделать checkpoint WAL
+        """
+        after = None
+        while True:
+            async with self._session_factory() as session:
+                rows, after = await crud.list_rates_page(
+                    session, start, end, codes, after=after, limit=self._chunk_size
+                )
+            for row in rows:
+                yield row
+            if len(rows) < self._chunk_size:
+                return
+
+    def status(self) -> dict:
+        """Статус повтора"""
+        elapsed = None
+        if self.started_at:
+            finished = self.finished_at or datetime.now(timezone.utc)
+            elapsed = (finished - self.started_at).total_seconds()
+        return {
+            "running": self.is_running,
+            "params": self._params,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "position": self.position,
+            "events_sent": self.events_sent,
+            "rows_sent": self.rows_sent,
+            "events_per_second": round(self.events_sent / elapsed, 2) if elapsed else None,
+            "last_error": self.last_error,
+        }
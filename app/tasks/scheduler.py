@@ -0,0 +1,100 @@
+import heapq
+import math
+from typing import Optional
+
+
+def next_aligned(after: float, interval: float) -> float:
+    """Ближайшая граница сетки interval секунд от epoch строго после after"""
+    return (math.floor(after / interval) + 1) * interval
+
+
+class PollScheduler:
+    """Расписание опроса пар со своим интервалом у каждой
+
+    Моменты опроса выровнены по сетке настенных часов, поэтому интервал не
+    уплывает на время запроса, а пары с общим моментом попадают в одну пачку
+    """
+
+    def __init__(self, default_interval: float, *, tolerance: float = 0.5) -> None:
+        self._default = float(default_interval)
+        self._tolerance = tolerance
+        self._heap: list[tuple[float, str, int]] = []
+        # code -> (интервал, поколение), устаревшие записи кучи пропускаются
+        self._entries: dict[str, tuple[float, int]] = {}
+        self._generation = 0
+        self.paused_until: Optional[float] = None
+
+    def sync(self, intervals: dict[str, Optional[float]], now: float) -> None:
+        """Привести расписание к текущему списку пар"""
+        for code in list(self._entries):
+            if code not in intervals:
+                del self._entries[code]
+
+        for code, interval in intervals.items():
+            interval = float(interval or self._default)
+            current = self._entries.get(code)
+            if current is not None and current[0] == interval:
+                continue
+            # Новая пара опрашивается сразу, дальше по сетке
+            due = now if current is None else next_aligned(now, interval)
+            self._push(code, interval, due)
+
+        # Куча чистится когда устаревших записей становится слишком много
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [
+                item for item in self._heap if self._entries.get(item[1], (0, -1))[1] == item[2]
+            ]
+            heapq.heapify(self._heap)
+
+    def _push(self, code: str, interval: float, due: float) -> None:
+        self._generation += 1
+        self._entries[code] = (interval, self._generation)
+        heapq.heappush(self._heap, (due, code, self._generation))
+
+    def _is_live(self, item: tuple[float, str, int]) -> bool:
+        entry = self._entries.get(item[1])
+        return entry is not None and entry[1] == item[2]
+
+    def pause(self, until: float) -> None:
+        """Не опрашивать ничего до until, например после 429 от Binance"""
+        self.paused_until = max(self.paused_until or 0.0, until)
+
+    def next_due(self) -> Optional[float]:
+        """Момент следующего опроса с учетом паузы"""
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        due = self._heap[0][0]
+        if self.paused_until is not None:
+            due = max(due, self.paused_until)
+        return due
+
+    def pop_due(self, now: float) -> list[str]:
+        """Забрать все пары которым пора и перепланировать их по сетке"""
+        if self.paused_until is not None:
+            if now < self.paused_until:
+                return []
+            self.paused_until = None
+
+        due_codes: list[str] = []
+        while self._heap and self._heap[0][0] <= now + self._tolerance:
+            item = heapq.heappop(self._heap)
+            if not self._is_live(item):
+                continue
+            code = item[1]
+            interval = self._entries[code][0]
+            due_codes.append(code)
+            # Следующий момент после окна tolerance, иначе пара вернется в этой же пачке
+            after = max(now + self._tolerance, item[0])
+            self._push(code, interval, next_aligned(after, interval))
+        return due_codes
+
+    def status(self) -> dict:
+        """Состояние расписания для отладки"""
+        return {
+            "pairs": len(self._entries),
+            "default_interval_seconds": self._default,
+            "next_due": self.next_due(),
+            "paused_until": self.paused_until,
+        }
@@ -1,17 +1,20 @@
-from typing import Iterable
+from typing import Iterable, Optional
 
 from fastapi import WebSocket
 from fastapi.encoders import jsonable_encoder
 from fastapi.websockets import WebSocketDisconnect
 from starlette.websockets import WebSocketState
 
+from ..services.tracing import LatencyTracker, is_traced, stamp
+
 
 class ConnectionManager:
     """Хранит активные WebSocket соединения"""
 
-    def __init__(self) -> None:
+    def __init__(self, tracker: Optional[LatencyTracker] = None) -> None:
         """Создает менеджер подключений"""
         self._connections: set[WebSocket] = set()
+        self._tracker = tracker
 
     async def connect(self, websocket: WebSocket) -> None:
         """Принимает подключение и сохраняет его"""
@@ -49,3 +52,8 @@ class ConnectionManager:
                 await ws.send_json(serializable)
             except Exception:
                 await self.disconnect(ws)
+
+        # У событий других реплик отметок нет, их часы с нашими не сравнимы
+        if self._tracker is not None and is_traced(message):
+            stamp(message, "fanned_out")
+            self._tracker.record(message)
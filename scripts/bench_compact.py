@@ -0,0 +1,152 @@
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert, select, text  # noqa: E402
+
+from app.db import compact  # noqa: E402
+from app.db.database import Base  # noqa: E402
+from app.models.orm import Rate, RateTick, Source, Symbol  # noqa: E402
+
+CHUNK = 50_000
+
+# Приложение держит коды и источники в кэше, поэтому запрос идет по symbol_id
+SYMBOL_IDS: dict[str, int] = {}
+
+
+def generate(rows: int, codes: list[str]):
+    """Синтетические тики раз в минуту для всех пар"""
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    prices = {code: Decimal(random.randint(1, 100_000)) for code in codes}
+    for i in range(rows // len(codes)):
+        fetched_at = started + timedelta(minutes=i)
+        for code in codes:
+            step = Decimal(random.randint(-1000, 1000)) / Decimal(100_000_000)
+            prices[code] = max(Decimal("0.00000001"), prices[code] * (1 + step))
+            yield code, prices[code].quantize(Decimal("0.00000001")), fetched_at
+
+
+def seed_legacy(engine, rows: int, codes: list[str]) -> None:
+    """Заполнить таблицу rates"""
+    Base.metadata.create_all(engine, tables=[Rate.__table__])
+    batch = []
+    with engine.begin() as conn:
+        for code, price, fetched_at in generate(rows, codes):
+            batch.append(
+                {
+                    "currency_code": code,
+                    "nominal": 1,
+                    "value": float(price),
+                    "fetched_at": fetched_at,
+                    "source": "binance",
+                }
+            )
+            if len(batch) >= CHUNK:
+                conn.execute(insert(Rate), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Rate), batch)
+
+
+def seed_compact(engine, rows: int, codes: list[str]) -> None:
+    """Заполнить таблицы symbols, sources и rate_ticks"""
+    tables = [Symbol.__table__, Source.__table__, RateTick.__table__]
+    Base.metadata.create_all(engine, tables=tables)
+    with engine.begin() as conn:
+        symbol_ids = {code: i for i, code in enumerate(codes, 1)}
+        SYMBOL_IDS.update(symbol_ids)
+        conn.execute(
+            insert(Symbol),
+            [
+                {"id": symbol_id, "code": code, "scale": compact.DEFAULT_SCALE}
+                for code, symbol_id in symbol_ids.items()
+            ],
+        )
+        conn.execute(insert(Source), [{"id": 1, "name": "binance"}])
+
+        batch = []
+        for code, price, fetched_at in generate(rows, codes):
+            batch.append(
+                {
+                    "symbol_id": symbol_ids[code],
+                    "source_id": 1,
+                    "ts_us": compact.to_us(fetched_at),
+                    "price": compact.to_scaled(price, compact.DEFAULT_SCALE),
+                }
+            )
+            if len(batch) >= CHUNK:
+                conn.execute(insert(RateTick), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(RateTick), batch)
+
+
+def time_queries(engine, make_stmt, codes: list[str], runs: int) -> list[float]:
+    """Время запроса истории как в GET /rates?limit=50"""
+    samples = []
+    with engine.connect() as conn:
+        for _ in range(runs):
+            stmt = make_stmt(random.choice(codes))
+            started = time.perf_counter()
+            conn.execute(stmt).all()
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def legacy_stmt(code: str):
+    return (
+        select(Rate)
+        .where(Rate.currency_code == code)
+        .order_by(Rate.fetched_at.desc())
+        .limit(50)
+    )
+
+
+def compact_stmt(code: str):
+    return compact._ticks_stmt(SYMBOL_IDS[code]).limit(50)
+
+
+def main() -> None:
+    """Точка входа"""
+    rows = int(os.getenv("BENCH_ROWS", "1000000"))
+    runs = int(os.getenv("BENCH_RUNS", "500"))
+    codes = [f"C{i:03d}USDT" for i in range(int(os.getenv("BENCH_CODES", "50")))]
+    random.seed(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, seed, make_stmt in (
+            ("rates", seed_legacy, legacy_stmt),
+            ("rate_ticks", seed_compact, compact_stmt),
+        ):
+            path = Path(tmp) / f"{name}.db"
+            engine = create_engine(f"sqlite:///{path}")
+            started = time.perf_counter()
+            seed(engine, rows, codes)
+            seed_seconds = time.perf_counter() - started
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("VACUUM"))
+            samples = time_queries(engine, make_stmt, codes, runs)
+            engine.dispose()
+            results[name] = (path.stat().st_size, seed_seconds, samples)
+
+        for name, (size, seed_seconds, samples) in results.items():
+            print(
+                f"{name}: {size / 1024 / 1024:.1f} MiB, seed {seed_seconds:.1f}s, "
+                f"/rates p50 {statistics.median(samples):.3f} ms, "
+                f"p95 {statistics.quantiles(samples, n=20)[18]:.3f} ms"
+            )
+        legacy_size, compact_size = results["rates"][0], results["rate_ticks"][0]
+        print(f"size ratio: {compact_size / legacy_size:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def time_to_first_200(port: int, fast: bool, timeout: float = 30.0) -> float:
+    """Запуск uvicorn и ожидание первого 200 от /items"""
+    env = {**os.environ, "FAST_STARTUP": "1" if fast else "0"}
+    # Первый тик не должен мешать замеру
+    env.setdefault("RATES_FIRST_DELAY_SECONDS", "30")
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/items"
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.01)
+        raise TimeoutError(f"no 200 from {url} in {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main() -> None:
+    """Точка входа"""
+    runs = int(os.getenv("BENCH_RUNS", "5"))
+    port = int(os.getenv("BENCH_PORT", "8765"))
+
+    for fast in (False, True):
+        samples = []
+        for _ in range(runs):
+            try:
+                samples.append(time_to_first_200(port, fast))
+            except Exception as err:
+                print(f"fast_startup={fast}: {type(err).__name__}: {err}")
+                break
+        if samples:
+            print(
+                f"fast_startup={fast}: median {statistics.median(samples) * 1000:.0f} ms, "
+                f"min {min(samples) * 1000:.0f} ms, max {max(samples) * 1000:.0f} ms "
+                f"({len(samples)} runs)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app.models.orm import Alert
+from app.services.alerts import AlertEngine
+
+
+def _alert(alert_id: int, kind: str, threshold: float, base_value=None, code="BTCUSDT") -> Alert:
+    return Alert(
+        id=alert_id,
+        currency_code=code,
+        kind=kind,
+        threshold=threshold,
+        base_value=base_value,
+        enabled=True,
+        triggered_at=None,
+    )
+
+
+def _engine(*alerts: Alert) -> AlertEngine:
+    engine = AlertEngine(session_factory=None)
+    for alert in alerts:
+        engine.add(alert)
+    return engine
+
+
+def _fired(engine: AlertEngine, price: float, code: str = "BTCUSDT") -> list[int]:
+    return [hit["id"] for hit in engine.evaluate({code: price})]
+
+
+def test_above_and_below_fire_on_crossing():
+    engine = _engine(_alert(1, "above", 100), _alert(2, "below", 90))
+
+    # Первый тик только запоминает цену
+    assert _fired(engine, 95) == []
+    assert _fired(engine, 99.9) == []
+    assert _fired(engine, 100) == [1]
+    assert _fired(engine, 91) == []
+    assert _fired(engine, 89) == [2]
+
+
+def test_rule_fires_only_once():
+    engine = _engine(_alert(1, "above", 100))
+
+    assert _fired(engine, 95) == []
+    assert _fired(engine, 105) == [1]
+    assert _fired(engine, 95) == []
+    assert _fired(engine, 105) == []
+    assert engine.status()["armed"] == 0
+    assert engine.triggered_total == 1
+
+
+def test_change_pct_fires_in_both_directions():
+    up = _engine(_alert(1, "change_pct", 10, base_value=100))
+    assert _fired(up, 100) == []
+    assert _fired(up, 109) == []
+    assert _fired(up, 111) == [1]
+
+    down = _engine(_alert(1, "change_pct", 10, base_value=100))
+    assert _fired(down, 100) == []
+    assert _fired(down, 89) == [1]
+
+
+def test_crossing_is_per_pair():
+    engine = _engine(_alert(1, "above", 100, code="ETHUSDT"))
+
+    assert _fired(engine, 95) == []
+    assert _fired(engine, 150) == []
+    assert _fired(engine, 95, code="ETHUSDT") == []
+    assert _fired(engine, 150, code="ETHUSDT") == [1]
+
+
+def test_changes_from_other_replicas_are_applied():
+    engine = _engine(_alert(1, "above", 100), _alert(2, "above", 200))
+
+    engine.handle_event({"type": "alerts_changed", "payload": {"id": 1, "alert": None}})
+    engine.handle_event({"type": "alert_triggered", "payload": {"id": 2}})
+    engine.handle_event(
+        {
+            "type": "alerts_changed",
+            "payload": {
+                "id": 3,
+                "alert": {
+                    "id": 3,
+                    "currency_code": "btcusdt",
+                    "kind": "below",
+                    "threshold": 50,
+                    "base_value": None,
+                    "enabled": True,
+                    "triggered_at": None,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                },
+            },
+        }
+    )
+
+    assert _fired(engine, 60) == []
+    assert _fired(engine, 250) == []
+    assert _fired(engine, 40) == [3]
+
+
+def test_failed_write_puts_rules_back():
+    class BrokenSession:
+        async def __aenter__(self):
+            raise RuntimeError("database is locked")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    engine = AlertEngine(session_factory=BrokenSession)
+    engine.add(_alert(1, "above", 100))
+    assert _fired(engine, 95) == []
+    hits = engine.evaluate({"BTCUSDT": 105})
+
+    stored = asyncio.run(engine.mark_triggered(hits, retry_seconds=0))
+
+    assert stored == []
+    assert engine.status()["armed"] == 1
+    assert engine.triggered_total == 0
+    assert _fired(engine, 95) == []
+    assert _fired(engine, 105) == [1]
@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db import crud
+from app.db.database import get_read_session, get_session, init_db
+from app.main import app
+
+
+def _run(tmp_path, scenario) -> None:
+    async def main() -> None:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'items.db'}", poolclass=NullPool
+        )
+        await init_db(bind=engine)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def session():
+            async with sessions() as item:
+                yield item
+
+        app.dependency_overrides[get_session] = session
+        app.dependency_overrides[get_read_session] = session
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await scenario(client)
+        finally:
+            app.dependency_overrides.clear()
+            await engine.dispose()
+
+    asyncio.run(main())
+
+
+def test_bulk_update_keeps_fields_not_sent(tmp_path):
+    async def scenario(client):
+        await client.post(
+            "/items",
+            json={"code": "BTCUSDT", "name": "Bitcoin", "poll_interval_seconds": 5},
+        )
+        response = await client.post(
+            "/items/bulk",
+            json={"items": [{"code": "btcusdt", "enabled": False}], "on_conflict": "update"},
+        )
+        assert response.status_code == 200
+        [item] = response.json()["updated"]
+        assert item["name"] == "Bitcoin"
+        assert item["poll_interval_seconds"] == 5
+        assert item["enabled"] is False
+
+    _run(tmp_path, scenario)
+
+
+def test_bulk_create_reports_concurrent_inserts_as_conflicts(tmp_path, monkeypatch):
+    async def scenario(client):
+        await client.post("/items", json={"code": "ETHUSDT"})
+
+        # Параллельный запрос вставил ETHUSDT уже после чтения существующих кодов
+        async def nothing_found(session, codes):
+            return {}
+
+        monkeypatch.setattr(crud, "_currencies_by_codes", nothing_found)
+        response = await client.post(
+            "/items/bulk", json={"items": [{"code": "BTCUSDT"}, {"code": "ETHUSDT"}]}
+        )
+        monkeypatch.undo()
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["conflicts"] == [{"code": "ETHUSDT", "reason": "already exists"}]
+        codes = [item["code"] for item in (await client.get("/items")).json()]
+        assert sorted(codes) == ["BTCUSDT", "ETHUSDT"]
+
+    _run(tmp_path, scenario)
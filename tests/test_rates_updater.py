@@ -0,0 +1,83 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.tasks.rates_updater import RatesUpdater
+
+
+def _binance(requests: list[dict], unknown: set[str]):
+    """Поддельный /ticker/price, неизвестный символ роняет весь запрос"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        requests.append(params)
+        symbols = json.loads(params["symbols"]) if "symbols" in params else [params["symbol"]]
+        if unknown & set(symbols):
+            return httpx.Response(400, json={"code": -1121, "msg": "Invalid symbol."})
+        prices = [{"symbol": symbol, "price": "1.00000000"} for symbol in symbols]
+        return httpx.Response(200, json=prices if "symbols" in params else prices[0])
+
+    return handler
+
+
+def _mock_client(monkeypatch, handler) -> None:
+    transport = httpx.MockTransport(handler)
+    client = httpx.AsyncClient
+
+    def mocked_client(**kwargs):
+        return client(transport=transport, **kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", mocked_client)
+
+
+def test_bad_symbol_is_isolated_and_skipped_later(monkeypatch):
+    requests: list[dict] = []
+    _mock_client(monkeypatch, _binance(requests, unknown={"C013USDT"}))
+
+    updater = RatesUpdater(session_factory=None)
+    symbols = [f"C{i:03d}USDT" for i in range(100)]
+
+    prices = asyncio.run(updater._fetch_remote_prices(symbols))
+    assert len(prices) == 99
+    assert "C013USDT" not in prices
+    # Деление пополам вместо 100 одиночных запросов
+    assert len(requests) < 20
+    assert updater.status()["rejected_symbols"] == ["C013USDT"]
+
+    requests.clear()
+    prices = asyncio.run(updater._fetch_remote_prices(symbols))
+    assert len(prices) == 99
+    assert len(requests) == 1
+
+
+def test_rate_limit_pauses_scheduler(monkeypatch):
+    statuses = [429, 429, 200]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses.pop(0)
+        if status != 200:
+            return httpx.Response(status, headers={"Retry-After": "5"})
+        return httpx.Response(200, json=[{"symbol": "BTCUSDT", "price": "1.0"}])
+
+    _mock_client(monkeypatch, handler)
+    updater = RatesUpdater(session_factory=None, interval_seconds=60)
+    updater._scheduler.sync({"BTCUSDT": None}, now=time.time())
+
+    started = time.time()
+    assert asyncio.run(updater._fetch_remote_prices(["BTCUSDT"])) == {}
+    # Retry-After меньше интервала, пауза не короче интервала
+    paused_until = updater.status()["scheduler"]["paused_until"]
+    assert started + 60 <= paused_until <= time.time() + 60
+    assert updater._scheduler.pop_due(time.time()) == []
+    assert updater._scheduler.next_due() == paused_until
+    assert "rate limit" in updater.status()["last_error"]
+
+    # Повторный 429 удваивает паузу
+    assert asyncio.run(updater._fetch_remote_prices(["BTCUSDT"])) == {}
+    assert updater.status()["scheduler"]["paused_until"] >= started + 120
+
+    # Успешный ответ сбрасывает рост паузы
+    assert asyncio.run(updater._fetch_remote_prices(["BTCUSDT"])) == {"BTCUSDT": "1.0"}
+    assert updater._backoff == 0.0
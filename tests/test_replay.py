@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db import crud
+from app.db.database import init_db
+from app.tasks.replay import RatesReplayer
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_replay_groups_ticks_across_pages(tmp_path):
+    events: list[dict] = []
+
+    async def notifier(event: dict) -> None:
+        events.append(event)
+
+    async def main() -> None:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'replay.db'}", poolclass=NullPool
+        )
+        await init_db(bind=engine)
+        rows = [
+            {
+                "currency_code": code,
+                "nominal": 1,
+                "value": float(minute),
+                "fetched_at": T0 + timedelta(minutes=minute),
+                "source": "test",
+            }
+            for minute in range(4)
+            for code in ("BTCUSDT", "ETHUSDT", "BNBUSDT")
+        ]
+        async with AsyncSession(engine) as session:
+            await crud.bulk_create_rates(session, rows)
+
+        # Страница в 2 строки меньше тика из 3 пар
+        replayer = RatesReplayer(
+            async_sessionmaker(engine, expire_on_commit=False), notifier, chunk_size=2
+        )
+        await replayer.start(T0 + timedelta(minutes=1), codes=["btcusdt", "ETHUSDT", "BNBUSDT"])
+        await replayer._task
+        await engine.dispose()
+
+        assert replayer.last_error is None
+        assert replayer.rows_sent == 9
+
+    asyncio.run(main())
+
+    assert [len(event["payload"]) for event in events] == [3, 3, 3]
+    assert all(event["meta"] == {"replay": True} for event in events)
+    assert [event["payload"][0]["value"] for event in events] == [1.0, 2.0, 3.0]
@@ -0,0 +1,72 @@
+from app.tasks.scheduler import PollScheduler, next_aligned
+
+
+def test_next_aligned_is_strictly_after():
+    assert next_aligned(1000, 60) == 1020
+    assert next_aligned(1020, 60) == 1080
+    assert next_aligned(1019.9, 60) == 1020
+
+
+def test_new_pair_is_due_now_then_on_grid():
+    scheduler = PollScheduler(60)
+    scheduler.sync({"BTCUSDT": None}, now=1000)
+
+    assert scheduler.next_due() == 1000
+    assert scheduler.pop_due(1000) == ["BTCUSDT"]
+    # Дальше по сетке, а не now + interval
+    assert scheduler.next_due() == 1020
+    assert scheduler.pop_due(1010) == []
+    # Опоздание тика не сдвигает сетку
+    assert scheduler.pop_due(1023) == ["BTCUSDT"]
+    assert scheduler.next_due() == 1080
+
+
+def test_pairs_with_common_moment_are_grouped():
+    scheduler = PollScheduler(60)
+    scheduler.sync({"BTCUSDT": 60, "ETHUSDT": 60, "BNBUSDT": 30, "SOLUSDT": 300}, now=1000)
+    assert sorted(scheduler.pop_due(1000)) == ["BNBUSDT", "BTCUSDT", "ETHUSDT", "SOLUSDT"]
+
+    # 1020: границы 30 и 60 совпадают
+    assert scheduler.next_due() == 1020
+    assert sorted(scheduler.pop_due(1020)) == ["BNBUSDT", "BTCUSDT", "ETHUSDT"]
+    assert scheduler.pop_due(1050) == ["BNBUSDT"]
+    assert sorted(scheduler.pop_due(1080)) == ["BNBUSDT", "BTCUSDT", "ETHUSDT"]
+    assert scheduler.pop_due(1110) == ["BNBUSDT"]
+    assert sorted(scheduler.pop_due(1200)) == ["BNBUSDT", "BTCUSDT", "ETHUSDT", "SOLUSDT"]
+
+
+def test_pair_is_returned_once_per_call():
+    scheduler = PollScheduler(1)
+    scheduler.sync({"BTCUSDT": 1}, now=1000)
+    # Окно tolerance шире шага сетки, но пара в пачке одна
+    assert scheduler.pop_due(1000.8) == ["BTCUSDT"]
+    assert scheduler.next_due() > 1001.3
+
+
+def test_changed_interval_and_removed_pair():
+    scheduler = PollScheduler(60)
+    scheduler.sync({"BTCUSDT": 60, "ETHUSDT": 60}, now=1000)
+    scheduler.pop_due(1000)
+
+    scheduler.sync({"BTCUSDT": 10}, now=1005)
+    assert scheduler.next_due() == 1010
+    assert scheduler.pop_due(1020) == ["BTCUSDT"]
+    assert scheduler.status()["pairs"] == 1
+
+
+def test_pause_blocks_and_shifts_next_due():
+    scheduler = PollScheduler(60)
+    scheduler.sync({"BTCUSDT": 60}, now=1000)
+    scheduler.pop_due(1000)
+
+    scheduler.pause(1100)
+    # Более короткая пауза не сокращает уже выставленную
+    scheduler.pause(1050)
+    assert scheduler.next_due() == 1100
+    assert scheduler.pop_due(1080) == []
+    assert scheduler.status()["paused_until"] == 1100
+
+    # Пропущенные моменты отдаются одной пачкой после паузы
+    assert scheduler.pop_due(1100) == ["BTCUSDT"]
+    assert scheduler.status()["paused_until"] is None
+    assert scheduler.next_due() == 1140
@@ -0,0 +1,137 @@
+import asyncio
+import json
+from typing import Optional
+
+from app.sse.manager import EventStreamManager, filter_event
+
+
+class _Request:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def _rates(*codes: str) -> dict:
+    return {"type": "rates_updated", "payload": [{"currency_code": c, "rate": 1} for c in codes]}
+
+
+def _parse(frame: str) -> tuple[Optional[str], Optional[dict]]:
+    event_id = data = None
+    for line in frame.strip().splitlines():
+        if line.startswith("id: "):
+            event_id = line[4:]
+        elif line.startswith("data: "):
+            data = json.loads(line[6:])
+    return event_id, data
+
+
+async def _take(stream, count: int) -> list[tuple[Optional[str], Optional[dict]]]:
+    """Первые count кадров потока без retry"""
+    frames = []
+    try:
+        while len(frames) < count:
+            frame = await asyncio.wait_for(stream.__anext__(), 1)
+            if not frame.startswith("retry:"):
+                frames.append(_parse(frame))
+    finally:
+        await stream.aclose()
+    return frames
+
+
+def test_filter_event_by_codes():
+    codes = frozenset({"BTCUSDT"})
+
+    filtered = filter_event(_rates("BTCUSDT", "ETHUSDT"), codes)
+    assert [row["currency_code"] for row in filtered["payload"]] == ["BTCUSDT"]
+    assert filter_event(_rates("ETHUSDT"), codes) is None
+
+    created = {"type": "currency_created", "payload": {"code": "btcusdt"}}
+    assert filter_event(created, codes) is created
+    other = {"type": "currency_created", "payload": {"code": "ETHUSDT"}}
+    assert filter_event(other, codes) is None
+
+    # События без кода пары получают все
+    status = {"type": "status", "payload": {"running": True}}
+    assert filter_event(status, codes) is status
+    empty = {"type": "rates_updated", "payload": []}
+    assert filter_event(empty, codes) is empty
+
+
+def test_live_events_are_filtered_per_client():
+    async def scenario():
+        manager = EventStreamManager()
+        stream = manager.stream(_Request(), codes=frozenset({"ETHUSDT"}))
+        await stream.__anext__()
+        welcome = await stream.__anext__()
+        assert "welcome" in welcome
+
+        await manager.broadcast(_rates("BTCUSDT"))
+        await manager.broadcast(_rates("BTCUSDT", "ETHUSDT"))
+        return manager, await _take(stream, 1)
+
+    manager, frames = asyncio.run(scenario())
+    event_id, data = frames[0]
+    assert event_id == f"{manager.boot_id}-2"
+    assert data["payload"] == [{"currency_code": "ETHUSDT", "rate": 1}]
+
+
+def test_resume_replays_buffered_events():
+    async def scenario():
+        manager = EventStreamManager()
+        for code in ("A", "B", "C", "D"):
+            await manager.broadcast(_rates(code))
+        stream = manager.stream(_Request(), last_event_id=f"{manager.boot_id}-2")
+        frames = await _take(stream, 2)
+        return manager, frames
+
+    manager, frames = asyncio.run(scenario())
+    assert [event_id for event_id, _ in frames] == [f"{manager.boot_id}-3", f"{manager.boot_id}-4"]
+    assert [data["payload"][0]["currency_code"] for _, data in frames] == ["C", "D"]
+
+
+def test_resume_then_live_without_duplicates():
+    async def scenario():
+        manager = EventStreamManager()
+        await manager.broadcast(_rates("A"))
+        stream = manager.stream(_Request(), last_event_id=f"{manager.boot_id}-1")
+        await stream.__anext__()
+        await manager.broadcast(_rates("B"))
+        return manager, await _take(stream, 1)
+
+    manager, frames = asyncio.run(scenario())
+    assert frames[0][0] == f"{manager.boot_id}-2"
+
+
+def test_unknown_id_gets_resync_then_live_events():
+    async def scenario(last_event_id: str):
+        manager = EventStreamManager()
+        await manager.broadcast(_rates("A"))
+        stream = manager.stream(_Request(), last_event_id=last_event_id.format(manager.boot_id))
+        # Чужой id не повторяет буфер, следующий кадр уже живое событие
+        first = await stream.__anext__()
+        assert first.startswith("retry:")
+        resync = _parse(await stream.__anext__())
+        await manager.broadcast(_rates("B"))
+        return manager, [resync] + await _take(stream, 1)
+
+    # Старый формат, другой процесс, id из будущего
+    for raw in ("500", "deadbeef-1", "{}-7"):
+        manager, frames = asyncio.run(scenario(raw))
+        (resync_id, resync), (event_id, data) = frames
+        assert resync_id is None
+        assert resync["type"] == "resync"
+        assert event_id == f"{manager.boot_id}-2"
+        assert data["payload"][0]["currency_code"] == "B"
+
+
+def test_evicted_events_get_resync_and_rest_of_buffer():
+    async def scenario():
+        manager = EventStreamManager(buffer_size=2)
+        for code in ("A", "B", "C", "D"):
+            await manager.broadcast(_rates(code))
+        stream = manager.stream(_Request(), last_event_id=f"{manager.boot_id}-1")
+        return manager, await _take(stream, 3)
+
+    manager, frames = asyncio.run(scenario())
+    assert frames[0][1]["type"] == "resync"
+    boot = manager.boot_id
+    assert [event_id for event_id, _ in frames[1:]] == [f"{boot}-3", f"{boot}-4"]